@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import threading
+from dotenv import load_dotenv
+
+from src.api.snowflake_cortex import SnowflakeCortexClient, CortexThrottledError, CortexUnavailableError
+
+load_dotenv()
+
+
+class CortexAccount:
+    """One Snowflake account in the pool, with its own client, limits and counters"""
+
+    def __init__(self, name, client, weight=1.0, max_concurrency=8, requests_per_minute=0):
+        self.name = name
+        self.client = client
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.throttled = 0
+        self.busy_seconds = 0.0
+        self.latency_total = 0.0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.tokens = float(requests_per_minute)
+        self.refilled_at = time.monotonic()
+
+    def _refill(self, now):
+        if self.requests_per_minute:
+            self.tokens = min(
+                float(self.requests_per_minute),
+                self.tokens + (now - self.refilled_at) * self.requests_per_minute / 60.0
+            )
+        self.refilled_at = now
+
+    def available(self, now):
+        """Whether this account can take one more request right now"""
+        self._refill(now)
+        if now < self.cooldown_until or self.in_flight >= self.max_concurrency:
+            return False
+        return not self.requests_per_minute or self.tokens >= 1
+
+    def load(self):
+        return (self.in_flight / self.weight, self.requests / self.weight)
+
+
+class CortexAccountPool:
+    """
+    Spreads Cortex traffic over several Snowflake accounts.
+
+    Drop-in replacement for SnowflakeCortexClient. Each call goes to the
+    least-loaded available account, where load is in-flight requests (then
+    total requests) divided by the account weight. An account that is
+    throttled or unavailable is put in an exponentially growing cooldown and
+    the call fails over to the next account.
+
+    Given shared slots (a SharedSlots on the job queue database), each
+    account's concurrency and requests-per-minute limits are counted across
+    every worker process rather than per process. Cooldowns stay local:
+    each process backs off as soon as it sees throttling itself.
+    """
+
+    def __init__(self, accounts, max_cooldown=60, acquire_timeout=120, slots=None, poll_interval=0.05):
+        if not accounts:
+            raise ValueError("CortexAccountPool needs at least one account")
+        self.accounts = accounts
+        self.max_cooldown = max_cooldown
+        self.acquire_timeout = acquire_timeout
+        self.slots = slots
+        self.poll_interval = poll_interval
+        self.started_at = time.monotonic()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls, slots=None):
+        """
+        Build the pool from numbered settings in .env:
+
+            SNOWFLAKE_ACCOUNT_1, PERSONAL_ACCESS_TOKEN_1,
+            CORTEX_WEIGHT_1, CORTEX_ACCOUNT_CONCURRENCY_1, CORTEX_RPM_1, ...
+
+        Falls back to the single SNOWFLAKE_ACCOUNT / PERSONAL_ACCESS_TOKEN pair.
+        """
+        accounts = []
+        index = 1
+        while os.getenv(f"SNOWFLAKE_ACCOUNT_{index}"):
+            # Never fall back to the primary token: it would authenticate against the wrong account
+            pat_token = os.getenv(f"PERSONAL_ACCESS_TOKEN_{index}")
+            if not pat_token:
+                raise ValueError(f"PERSONAL_ACCESS_TOKEN_{index} not set in .env file")
+            weight = float(os.getenv(f"CORTEX_WEIGHT_{index}", "1"))
+            if weight <= 0:
+                raise ValueError(f"CORTEX_WEIGHT_{index} must be greater than 0, got {weight}")
+
+            concurrency = int(os.getenv(f"CORTEX_ACCOUNT_CONCURRENCY_{index}", "8"))
+            client = SnowflakeCortexClient(
+                account=os.getenv(f"SNOWFLAKE_ACCOUNT_{index}"),
+                pat_token=pat_token,
+                user=os.getenv(f"SNOWFLAKE_USER_{index}"),
+                pool_size=concurrency
+            )
+            accounts.append(CortexAccount(
+                # Several credentials may share one account, so the index keeps names unique
+                f"{client.account}#{index}",
+                client,
+                weight=weight,
+                max_concurrency=concurrency,
+                requests_per_minute=int(os.getenv(f"CORTEX_RPM_{index}", "0"))
+            ))
+            index += 1
+
+        if not accounts:
+            client = SnowflakeCortexClient()
+            accounts.append(CortexAccount(client.account, client))
+        return cls(accounts, slots=slots)
+
+    def complete(self, model, messages, **kwargs):
+        """Run a completion on the best available account, failing over on throttling"""
+        tried = set()
+        last_error = None
+
+        while len(tried) < len(self.accounts):
+            account, lease = self._acquire(exclude=tried, cancel_token=kwargs.get("cancel_token"))
+            if account is None:
+                break
+            tried.add(account.name)
+
+            started = time.monotonic()
+            try:
+                result = account.client.complete(model, messages, **kwargs)
+            except (CortexThrottledError, CortexUnavailableError) as e:
+                self._release(account, started, lease, failure=e)
+                last_error = e
+                continue
+            except Exception:
+                self._release(account, started, lease)
+                raise
+
+            self._release(account, started, lease)
+            return result
+
+        raise last_error or CortexUnavailableError("No Cortex account available")
+
+    def _acquire(self, exclude, cancel_token=None):
+        """Pick an account and take one of its slots; returns (account, shared lease or None)"""
+        if self.slots is not None:
+            return self._acquire_shared(exclude, cancel_token)
+
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                now = time.monotonic()
+                candidates = [
+                    account for account in self.accounts
+                    if account.name not in exclude and account.available(now)
+                ]
+                if candidates:
+                    account = min(candidates, key=CortexAccount.load)
+                    account.in_flight += 1
+                    account.requests += 1
+                    if account.requests_per_minute:
+                        account.tokens -= 1
+                    return account, None
+
+                remaining = [account for account in self.accounts if account.name not in exclude]
+                if not remaining or now >= deadline:
+                    return None, None
+
+                # Sleep until a slot frees up, a cooldown ends, a rate token refills
+                # or the caller is cancelled
+                wake_at = min(
+                    [account.cooldown_until for account in remaining if account.cooldown_until > now]
+                    + [deadline, now + (0.1 if cancel_token is not None else 1.0)]
+                )
+                self._condition.wait(max(wake_at - now, 0.01))
+
+    def _acquire_shared(self, exclude, cancel_token):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            now = time.monotonic()
+            with self._condition:
+                remaining = [account for account in self.accounts if account.name not in exclude]
+                candidates = [account for account in remaining if now >= account.cooldown_until]
+            if not remaining:
+                return None, None
+
+            # Least loaded across all processes first; an account whose limits are
+            # used up elsewhere just refuses the lease and the next one is tried
+            in_use = self.slots.in_use()
+            candidates.sort(key=lambda account: (
+                in_use.get(f"account:{account.name}", 0) / account.weight, account.requests / account.weight
+            ))
+            for account in candidates:
+                lease = self.slots.acquire(
+                    f"account:{account.name}",
+                    account.max_concurrency,
+                    rate_per_minute=account.requests_per_minute
+                )
+                if lease:
+                    with self._condition:
+                        account.in_flight += 1
+                        account.requests += 1
+                    return account, lease
+
+            if now >= deadline:
+                return None, None
+            with self._condition:
+                self._condition.wait(self.poll_interval)
+
+    def _release(self, account, started, lease=None, failure=None):
+        elapsed = time.monotonic() - started
+        if lease is not None:
+            self.slots.release(lease)
+        with self._condition:
+            account.in_flight -= 1
+            account.busy_seconds += elapsed
+
+            if failure is None:
+                account.successes += 1
+                account.latency_total += elapsed
+                account.consecutive_failures = 0
+            else:
+                account.errors += 1
+                if isinstance(failure, CortexThrottledError):
+                    account.throttled += 1
+                account.consecutive_failures += 1
+                cooldown = min(2 ** account.consecutive_failures, self.max_cooldown)
+                account.cooldown_until = time.monotonic() + cooldown
+                print(f"Warning: Cortex account {account.name} cooling down for {cooldown}s: {str(failure)}")
+
+            self._condition.notify_all()
+
+    def stats(self):
+        """Per-account utilization and health"""
+        now = time.monotonic()
+        elapsed = max(now - self.started_at, 1e-9)
+        in_use = self.slots.in_use() if self.slots is not None else {}
+        with self._condition:
+            return {
+                account.name: {
+                    "weight": account.weight,
+                    "in_flight": account.in_flight,
+                    "global_in_flight": in_use.get(f"account:{account.name}") if self.slots is not None else None,
+                    "max_concurrency": account.max_concurrency,
+                    "requests": account.requests,
+                    "errors": account.errors,
+                    "throttled": account.throttled,
+                    # Share of the account's concurrency used since the pool started
+                    "utilization": round(account.busy_seconds / (elapsed * account.max_concurrency), 4),
+                    "mean_latency_ms": round(1000 * account.latency_total / max(account.successes, 1), 1),
+                    "cooldown_s": round(max(account.cooldown_until - now, 0.0), 1)
+                }
+                for account in self.accounts
+            }
+
+
+if __name__ == "__main__":
+    pool = CortexAccountPool.from_env()
+    result = pool.complete("mistral-large2", [{"role": "user", "content": "test"}])
+    print(result)
+    print(json.dumps(pool.stats(), indent=2))
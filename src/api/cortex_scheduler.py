@@ -0,0 +1,235 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from src.utils.cancellation import CancelledError
+
+PRIORITIES = ("interactive", "batch")
+
+
+def parse_tenant_weights(text):
+    """Parse "tenant=weight,..." (e.g. CORTEX_TENANT_WEIGHTS) into a dict"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        tenant, _, weight = item.partition("=")
+        try:
+            weights[tenant.strip()] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid tenant weight: {item!r}. Expected tenant=weight")
+        if not tenant.strip() or weights[tenant.strip()] <= 0:
+            raise ValueError(f"Invalid tenant weight: {item!r}. Weights must be greater than 0")
+    return weights
+
+
+class CortexScheduler:
+    """
+    Admission control in front of SnowflakeCortexClient.
+
+    Every model has a concurrency budget shared by all callers. When the
+    budget is full, callers wait in per-priority queues: interactive work is
+    always admitted before batch work, and within a priority class the
+    tenant that has used the least of its weighted share goes next. A few
+    slots can be held back for interactive calls so an analyst never waits
+    behind a full batch.
+
+    Given shared slots (a SharedSlots on the job queue database), budgets
+    and the waiting line are global across every worker process instead of
+    per process. Tenant fairness then goes by slots currently held per
+    weight rather than by cumulative usage.
+    """
+
+    def __init__(self, client, default_budget=None, model_budgets=None,
+                 interactive_reserve=1, tenant_weights=None, slots=None, poll_interval=0.05):
+        self.client = client
+        self.default_budget = default_budget or int(os.getenv("CORTEX_MAX_CONCURRENCY", "4"))
+        self.model_budgets = model_budgets or {}
+        self.interactive_reserve = interactive_reserve
+        if tenant_weights is None:
+            tenant_weights = parse_tenant_weights(os.getenv("CORTEX_TENANT_WEIGHTS"))
+        self.tenant_weights = tenant_weights
+        self.slots = slots
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._leases = threading.local()
+        self._in_flight = {}
+        self._waiting = {}
+        self._usage = {}
+        self._waits = {}
+
+    def complete(self, model, messages, priority="interactive", tenant="default", **kwargs):
+        """Run client.complete once the model has a free slot for this caller"""
+        with self.slot(model, priority, tenant, kwargs.get("cancel_token")):
+            return self.client.complete(model, messages, **kwargs)
+
+    @contextmanager
+    def slot(self, model, priority="interactive", tenant="default", cancel_token=None):
+        """Hold one unit of a model's concurrency budget"""
+        wait_seconds = self.acquire(model, priority, tenant, cancel_token)
+        try:
+            yield wait_seconds
+        finally:
+            self.release(model)
+
+    def acquire(self, model, priority="interactive", tenant="default", cancel_token=None):
+        """
+        Block until admitted and return the time spent waiting, in seconds.
+
+        Raises CancelledError, without holding a slot, if cancel_token is
+        cancelled while waiting.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Valid: {list(PRIORITIES)}")
+        if self.slots is not None:
+            return self._acquire_shared(model, priority, tenant, cancel_token)
+
+        ticket = threading.Event()
+        queued_at = time.monotonic()
+        with self._lock:
+            tenants = self._waiting.setdefault(model, {p: {} for p in PRIORITIES})[priority]
+            # A tenant returning from idle starts level with the tenants already
+            # waiting instead of cashing in the share it did not use
+            active = [self._usage.get(t, 0.0) for t in tenants if t != tenant]
+            if active:
+                self._usage[tenant] = max(self._usage.get(tenant, 0.0), min(active))
+            tenants.setdefault(tenant, deque()).append(ticket)
+            self._dispatch(model)
+
+        while not ticket.wait(0.1 if cancel_token is not None else None):
+            if cancel_token.cancelled:
+                self._withdraw(model, priority, tenant, ticket)
+                raise CancelledError(cancel_token.reason)
+
+        wait_seconds = time.monotonic() - queued_at
+        self._record_wait(model, priority, wait_seconds)
+        return wait_seconds
+
+    def _acquire_shared(self, model, priority, tenant, cancel_token):
+        queued_at = time.monotonic()
+        resource = f"model:{model}"
+        budget = self.budget(model)
+        ticket = self.slots.enqueue(
+            resource, PRIORITIES.index(priority), tenant, self.tenant_weights.get(tenant, 1.0)
+        )
+        try:
+            while not self.slots.admit(ticket, resource, budget, min(self.interactive_reserve, budget - 1)):
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise CancelledError(cancel_token.reason)
+                # Woken early when a call in this process finishes; other processes are polled
+                with self._released:
+                    self._released.wait(self.poll_interval)
+        except BaseException:
+            self.slots.withdraw(ticket)
+            raise
+
+        with self._lock:
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+        self._held_leases().append((model, ticket))
+        wait_seconds = time.monotonic() - queued_at
+        self._record_wait(model, priority, wait_seconds)
+        return wait_seconds
+
+    def _held_leases(self):
+        # Shared leases taken by the current thread, so release(model) can find its own
+        if not hasattr(self._leases, "held"):
+            self._leases.held = []
+        return self._leases.held
+
+    def _withdraw(self, model, priority, tenant, ticket):
+        with self._lock:
+            if not ticket.is_set():
+                tenants = self._waiting[model][priority]
+                tenants[tenant].remove(ticket)
+                if not tenants[tenant]:
+                    del tenants[tenant]
+                return
+        # Admitted just as the caller gave up: hand the slot straight back
+        self.release(model)
+
+    def release(self, model):
+        """Return a slot to the model's budget and admit the next caller"""
+        if self.slots is not None:
+            held = self._held_leases()
+            index = max(i for i, (leased_model, _) in enumerate(held) if leased_model == model)
+            self.slots.release(held.pop(index)[1])
+            with self._lock:
+                self._in_flight[model] -= 1
+                self._released.notify_all()
+            return
+
+        with self._lock:
+            self._in_flight[model] -= 1
+            self._dispatch(model)
+
+    def budget(self, model):
+        return self.model_budgets.get(model, self.default_budget)
+
+    def _dispatch(self, model):
+        # Called with the lock held: admit waiters while the budget allows
+        budget = self.budget(model)
+        queues = self._waiting.get(model, {})
+        while True:
+            in_flight = self._in_flight.get(model, 0)
+            priority = next((p for p in PRIORITIES if queues.get(p)), None)
+            if priority is None or in_flight >= budget:
+                return
+            if priority != "interactive" and in_flight >= budget - min(self.interactive_reserve, budget - 1):
+                return
+
+            tenants = queues[priority]
+            tenant = min(tenants, key=lambda t: self._usage.get(t, 0.0))
+            ticket = tenants[tenant].popleft()
+            if not tenants[tenant]:
+                del tenants[tenant]
+
+            self._usage[tenant] = self._usage.get(tenant, 0.0) + 1.0 / self.tenant_weights.get(tenant, 1.0)
+            self._in_flight[model] = in_flight + 1
+            ticket.set()
+
+    def _record_wait(self, model, priority, wait_seconds):
+        with self._lock:
+            waits = self._waits.setdefault((model, priority), {
+                "count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=1000)
+            })
+            waits["count"] += 1
+            waits["total"] += wait_seconds
+            waits["max"] = max(waits["max"], wait_seconds)
+            waits["recent"].append(wait_seconds)
+
+    def stats(self):
+        """Snapshot of in-flight calls, queue depth and queue wait times per model"""
+        shared = self.slots is not None
+        # In shared mode the line lives in the database, not in _waiting
+        in_use = self.slots.in_use() if shared else {}
+        waiters = self.slots.queued() if shared else {}
+        with self._lock:
+            models = set(self._in_flight) | set(self._waiting)
+            models |= {r[len("model:"):] for r in set(in_use) | set(waiters) if r.startswith("model:")}
+            stats = {}
+            for model in sorted(models):
+                if shared:
+                    ranks = waiters.get(f"model:{model}", {})
+                    queued = {p: ranks.get(rank, 0) for rank, p in enumerate(PRIORITIES)}
+                else:
+                    queues = self._waiting.get(model, {})
+                    queued = {p: sum(len(q) for q in queues.get(p, {}).values()) for p in PRIORITIES}
+                stats[model] = {
+                    "budget": self.budget(model),
+                    "in_flight": self._in_flight.get(model, 0),
+                    "global_in_flight": in_use.get(f"model:{model}", 0) if shared else None,
+                    "queued": queued,
+                    "wait_ms": {},
+                }
+
+            for (model, priority), waits in self._waits.items():
+                recent = sorted(waits["recent"])
+                stats.setdefault(model, {"wait_ms": {}})["wait_ms"][priority] = {
+                    "count": waits["count"],
+                    "mean": round(1000 * waits["total"] / waits["count"], 1),
+                    "p95": round(1000 * recent[int(0.95 * (len(recent) - 1))], 1),
+                    "max": round(1000 * waits["max"], 1),
+                }
+            return stats
@@ -0,0 +1,126 @@
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.api.cortex_scheduler import PRIORITIES
+from src.utils.job_queue import JobQueue
+from src.models.verification_engine import MODEL_CATEGORIES
+
+
+class JobAPIHandler(BaseHTTPRequestHandler):
+    """
+    REST endpoints for the verification job queue
+
+    POST /jobs                 {"category": ..., "content": ..., "priority": ..., "tenant": ...,
+                                "deadline_seconds": ...} -> 202 {"job_id": ...}
+    POST /jobs/<job_id>/cancel stop the job, keeping any partial result
+    GET  /jobs/<job_id>        job status
+    GET  /jobs/<job_id>/result verification result once the job is done (partial if cancelled)
+    GET  /metrics              job counts and queue wait per priority
+
+    API submissions default to the "batch" priority so bulk clients never
+    crowd out analysts using the UI.
+    """
+
+    queue = None
+
+    def do_POST(self):
+        parts = [part for part in self.path.split("/") if part]
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            status = self.queue.cancel(parts[1], "Cancelled via API")
+            if status is None:
+                return self._send(404, {"message": f"Unknown job: {parts[1]}"})
+            return self._send(202, {"job_id": parts[1], "status": status})
+        if parts != ["jobs"]:
+            return self._send(404, {"message": "Not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._send(400, {"message": "Request body must be JSON"})
+        if not isinstance(body, dict):
+            return self._send(400, {"message": "Request body must be a JSON object"})
+
+        category = str(body.get("category", "")).lower().strip()
+        content = body.get("content", "")
+        if not category or not isinstance(content, str) or not content.strip():
+            return self._send(400, {"message": "Both 'category' and 'content' (a string) are required"})
+        # Rejected here rather than failing later in a worker
+        if category not in MODEL_CATEGORIES:
+            return self._send(400, {"message": f"Unknown category: {category}. Valid: {list(MODEL_CATEGORIES)}"})
+
+        priority = body.get("priority", "batch")
+        tenant = str(body.get("tenant", "default"))
+        if priority not in PRIORITIES:
+            return self._send(400, {"message": f"Unknown priority: {priority}. Valid: {list(PRIORITIES)}"})
+
+        deadline = body.get("deadline_seconds")
+        try:
+            deadline = float(deadline) if deadline is not None else None
+        except (TypeError, ValueError):
+            return self._send(400, {"message": "'deadline_seconds' must be a number"})
+
+        job_id = self.queue.submit(category, content, priority=priority, tenant=tenant, deadline=deadline)
+        self._send(202, {"job_id": job_id, "status": "queued"})
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("/") if part]
+        if parts == ["metrics"]:
+            return self._send(200, self.queue.metrics())
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._send(404, {"message": "Not found"})
+
+        job_id = parts[1]
+        if len(parts) == 2:
+            status = self.queue.status(job_id)
+            if status is None:
+                return self._send(404, {"message": f"Unknown job: {job_id}"})
+            return self._send(200, status)
+
+        if len(parts) == 3 and parts[2] == "result":
+            job = self.queue.get(job_id)
+            if job is None:
+                return self._send(404, {"message": f"Unknown job: {job_id}"})
+            if job["status"] == "failed":
+                return self._send(500, {"job_id": job_id, "status": "failed", "error": job["error"]})
+            if job["status"] == "cancelled":
+                return self._send(200, {
+                    "job_id": job_id, "status": "cancelled", "error": job["error"], "result": job["result"]
+                })
+            if job["status"] != "done":
+                return self._send(409, {"job_id": job_id, "status": job["status"]})
+            return self._send(200, {"job_id": job_id, "status": "done", "result": job["result"]})
+
+        self._send(404, {"message": "Not found"})
+
+    def _send(self, status_code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(host="127.0.0.1", port=8502, db_path="jobs/jobs.db"):
+    """Serve the job API until interrupted"""
+    JobAPIHandler.queue = JobQueue(db_path)
+    server = ThreadingHTTPServer((host, port), JobAPIHandler)
+    print(f"Job API listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TruthGuard verification job API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--db", default="jobs/jobs.db", help="Path to the job queue database")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.db)
@@ -1,23 +1,46 @@
 import os
 import requests
 import json
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from src.utils.cancellation import CancelledError
+
 load_dotenv()
 
+
+class CortexThrottledError(Exception):
+    """The account hit its Cortex rate limit (HTTP 429)"""
+
+
+class CortexUnavailableError(Exception):
+    """The account cannot serve requests right now (5xx, auth or connection failure)"""
+
+
 class SnowflakeCortexClient:
-    def __init__(self):
-        self.account = os.getenv("SNOWFLAKE_ACCOUNT").lower().strip()
-        self.user = os.getenv("SNOWFLAKE_USER")
-        self.pat_token = os.getenv("PERSONAL_ACCESS_TOKEN")
+    def __init__(self, account=None, pat_token=None, user=None, pool_size=10):
+        self.account = (account or os.getenv("SNOWFLAKE_ACCOUNT") or "").lower().strip()
+        self.user = user or os.getenv("SNOWFLAKE_USER")
+        self.pat_token = pat_token or os.getenv("PERSONAL_ACCESS_TOKEN")
         
         self.base_url = f"https://{self.account}.snowflakecomputing.com"
         
+        if not self.account:
+            raise ValueError("SNOWFLAKE_ACCOUNT not set in .env file")
         if not self.pat_token:
             raise ValueError("PERSONAL_ACCESS_TOKEN not set in .env file")
+        
+        # Keep-alive connection pool for this account
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def complete(self, model, messages, temperature=0.0, max_tokens=1024, cancel_token=None):
+        """
+        Call Cortex LLM inference endpoint - handles streaming SSE responses
 
-    def complete(self, model, messages, temperature=0.0, max_tokens=1024):
-        """Call Cortex LLM inference endpoint - handles streaming SSE responses"""
+        Cancelling cancel_token (or reaching its deadline) closes the stream
+        and raises CancelledError carrying the content received so far.
+        """
         url = f"{self.base_url}/api/v2/cortex/inference:complete"
         
         headers = {
@@ -33,8 +56,31 @@ class SnowflakeCortexClient:
             "max_tokens": max_tokens,
         }
         
-        response = requests.post(url, headers=headers, json=payload, stream=True)
+        timeout = None
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+            remaining = cancel_token.remaining()
+            if remaining is not None:
+                timeout = (min(remaining, 10), remaining)
+        
+        try:
+            response = self.session.post(url, headers=headers, json=payload, stream=True, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise CancelledError(cancel_token.reason)
+            raise CortexUnavailableError(f"Connection to {self.account} failed: {str(e)}")
         
+        # Cancelling from another thread closes the socket, which unblocks the read below
+        cancel_key = cancel_token.on_cancel(response.close) if cancel_token is not None else None
+        try:
+            return self._read_stream(response, cancel_token)
+        finally:
+            if cancel_key is not None:
+                cancel_token.remove(cancel_key)
+            # Return the connection to the pool even if the stream was not drained
+            response.close()
+
+    def _read_stream(self, response, cancel_token=None):
         if response.status_code == 400:
             try:
                 error_msg = response.json().get("message", response.text)
@@ -44,15 +90,18 @@ class SnowflakeCortexClient:
                 raise Exception(f"Model unavailable. Enable cross-region inference in Snowflake: {error_msg}")
             raise Exception(f"400 Bad Request: {error_msg}")
         elif response.status_code == 401:
-            raise Exception("401 Unauthorized: Check your Personal Access Token")
+            raise CortexUnavailableError("401 Unauthorized: Check your Personal Access Token")
         elif response.status_code == 403:
-            raise Exception("403 Forbidden: Check your token permissions")
+            raise CortexUnavailableError("403 Forbidden: Check your token permissions")
         elif response.status_code == 404:
             raise Exception(f"404 Not Found: Check account identifier")
-        elif response.status_code == 500:
-            raise Exception(f"500 Server Error: {response.text}")
+        elif response.status_code == 429:
+            raise CortexThrottledError(f"429 Too Many Requests: Cortex rate limit reached for {self.account}")
         elif response.status_code == 503:
-            raise Exception("503 Service Unavailable: Snowflake Cortex service temporarily down")
+            raise CortexUnavailableError("503 Service Unavailable: Snowflake Cortex service temporarily down")
+        elif response.status_code >= 500:
+            # 500, 502, 504, ...: let the account pool cool this account down and fail over
+            raise CortexUnavailableError(f"{response.status_code} Server Error: {response.text}")
         
         response.raise_for_status()
         
@@ -60,6 +109,8 @@ class SnowflakeCortexClient:
         content = ""
         try:
             for line in response.iter_lines():
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise CancelledError(cancel_token.reason, partial=content)
                 if not line:
                     continue
                 
@@ -78,8 +129,15 @@ class SnowflakeCortexClient:
                     except json.JSONDecodeError:
                         pass
             
+            # A stream closed by cancellation can end quietly instead of raising
+            if cancel_token is not None and cancel_token.cancelled:
+                raise CancelledError(cancel_token.reason, partial=content)
             return content
+        except CancelledError:
+            raise
         except Exception as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise CancelledError(cancel_token.reason, partial=content)
             raise Exception(f"Error parsing streaming response: {str(e)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,243 @@
+import os
+import time
+import argparse
+import threading
+import multiprocessing
+
+from src.api.cortex_scheduler import parse_tenant_weights
+from src.utils.job_queue import JobQueue
+from src.utils.shared_slots import SharedSlots
+from src.utils.helpers import verdict_label, credibility_score
+from src.utils.cancellation import CancellationToken
+
+
+def run_worker(db_path, worker_id, poll_interval=1.0, visibility_timeout=120, stop_event=None, threads=1,
+               tenant_weights=None):
+    """
+    Worker process: lease jobs from the queue and run them through VerificationEngine.
+
+    The process runs several worker threads that share one engine. Its
+    CortexScheduler keeps the model budgets in the queue database, so calls
+    from every worker process are arbitrated by priority and tenant together.
+    """
+    from src.models.verification_engine import VerificationEngine
+    from src.utils.logger import AnalysisLogger
+
+    queue = JobQueue(db_path, visibility_timeout=visibility_timeout)
+    try:
+        engine = VerificationEngine(slots=SharedSlots(db_path), tenant_weights=tenant_weights)
+    except Exception as e:
+        # A configuration problem (e.g. missing credentials) fails every job the
+        # same way: report it on the jobs instead of leaving them queued forever
+        print(f"[{worker_id}] Could not start verification engine: {str(e)}")
+        _reject_jobs(queue, worker_id, f"Error: {str(e)}", poll_interval, stop_event)
+        return
+    logger = AnalysisLogger()
+
+    workers = [
+        threading.Thread(
+            target=_work,
+            args=(queue, engine, logger, f"{worker_id}-t{i}", poll_interval, visibility_timeout, stop_event),
+            daemon=True
+        )
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+
+    reporter = threading.Thread(target=_report_stats, args=(queue, engine, worker_id, stop_event), daemon=True)
+    reporter.start()
+
+    for worker in workers:
+        worker.join()
+    _publish_stats(queue, engine, worker_id)
+
+
+def _reject_jobs(queue, worker_id, error, poll_interval, stop_event):
+    """Fail every job this worker claims with its start-up error"""
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        queue.fail(job["job_id"], worker_id, error, permanent=True)
+
+
+def _publish_stats(queue, engine, worker_id):
+    try:
+        queue.record_worker_stats(worker_id, {
+            "accounts": engine.client.stats(),
+            "scheduler": engine.scheduler.stats()
+        })
+    except Exception as e:
+        print(f"[{worker_id}] Could not record stats: {str(e)}")
+
+
+def _report_stats(queue, engine, worker_id, stop_event, interval=15):
+    """Publish per-account utilization and scheduler waits for the job API"""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.wait(interval):
+        _publish_stats(queue, engine, worker_id)
+
+
+def _work(queue, engine, logger, worker_id, poll_interval, visibility_timeout, stop_event):
+    """
+    Claim-and-run loop for a single worker thread.
+
+    While a job runs, a heartbeat thread keeps extending its lease so that
+    only workers that actually died have their jobs redelivered, and stops
+    the job as soon as it is cancelled, abandoned or past its deadline.
+    """
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        cancel_token = CancellationToken(deadline=job["deadline"])
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat,
+            args=(queue, job["job_id"], worker_id, visibility_timeout, heartbeat_stop, cancel_token),
+            daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            print(f"[{worker_id}] Running {job['priority']} job {job['job_id']} (attempt {job['attempts']})")
+            result = engine.verify(
+                job["category"],
+                job["content"],
+                priority=job["priority"],
+                tenant=job["tenant"],
+                cancel_token=cancel_token
+            )
+            if result.get("cancelled"):
+                print(f"[{worker_id}] Job {job['job_id']} stopped early: {result['cancelled']}")
+                queue.complete(job["job_id"], worker_id, result, status="cancelled", error=result["cancelled"])
+            elif queue.complete(job["job_id"], worker_id, result):
+                _log_verdict(logger, job, result)
+        except ValueError as e:
+            # Bad input (e.g. unknown category) will never succeed on retry
+            queue.fail(job["job_id"], worker_id, f"Error: {str(e)}", permanent=True)
+        except Exception as e:
+            print(f"[{worker_id}] Job {job['job_id']} failed: {str(e)}")
+            queue.fail(job["job_id"], worker_id, f"Error: {str(e)}")
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+            cancel_token.close()
+
+
+def _log_verdict(logger, job, result):
+    """Record the verdict with its content so the triage model can learn from it"""
+    individual = result.get("individual_responses", {})
+    logger.log_analysis(
+        job["category"],
+        "Verification complete",
+        "success",
+        metadata={
+            "job_id": job["job_id"],
+            "content": job["content"],
+            "verdict": verdict_label(result.get("consensus_analysis")),
+            "scores": {model: credibility_score(response) for model, response in individual.items()},
+            "triage": result.get("triage"),
+            "priority": job["priority"],
+            "tenant": job["tenant"]
+        }
+    )
+
+
+def _heartbeat(queue, job_id, worker_id, visibility_timeout, stop_event, cancel_token, check_interval=1.0):
+    """
+    Extend the job lease every third of the visibility timeout, and cancel
+    the job's token as soon as the queue says it should stop
+    """
+    next_extend = time.monotonic() + visibility_timeout / 3
+    while not stop_event.wait(check_interval):
+        try:
+            reason = queue.stop_reason(job_id)
+            if reason:
+                cancel_token.cancel(reason)
+                return
+            if time.monotonic() >= next_extend:
+                if not queue.extend_lease(job_id, worker_id, visibility_timeout):
+                    cancel_token.cancel("Lease lost to another worker")
+                    return
+                next_extend = time.monotonic() + visibility_timeout / 3
+        except Exception as e:
+            print(f"[{worker_id}] Heartbeat for job {job_id} failed: {str(e)}")
+
+
+class WorkerPool:
+    """Pool of worker processes consuming the verification job queue"""
+
+    def __init__(self, db_path="jobs/jobs.db", num_workers=2, poll_interval=1.0, visibility_timeout=120,
+                 threads_per_worker=4, tenant_weights=None):
+        self.db_path = db_path
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.tenant_weights = tenant_weights
+        # Spawn rather than fork: the pool may be started from a threaded server
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.processes = []
+
+    def start(self):
+        """Start the worker processes"""
+        # Create the schema once before the workers race to do it
+        JobQueue(self.db_path, visibility_timeout=self.visibility_timeout)
+
+        for i in range(self.num_workers):
+            worker_id = f"worker-{os.getpid()}-{i}"
+            process = self.context.Process(
+                target=run_worker,
+                args=(self.db_path, worker_id, self.poll_interval, self.visibility_timeout,
+                      self.stop_event, self.threads_per_worker, self.tenant_weights),
+                name=worker_id,
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def stop(self, timeout=10):
+        """Ask workers to exit after their current job, then terminate stragglers"""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    def alive(self):
+        """Number of worker processes still running"""
+        return sum(1 for process in self.processes if process.is_alive())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run TruthGuard verification workers")
+    parser.add_argument("--db", default="jobs/jobs.db", help="Path to the job queue database")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent jobs per worker process")
+    parser.add_argument("--visibility-timeout", type=int, default=120, help="Job lease length in seconds")
+    parser.add_argument("--tenant-weights", type=parse_tenant_weights, default=None,
+                        help='Fair-share weights, e.g. "screening=3,research=1" (default: CORTEX_TENANT_WEIGHTS)')
+    args = parser.parse_args()
+
+    pool = WorkerPool(
+        args.db,
+        num_workers=args.workers,
+        visibility_timeout=args.visibility_timeout,
+        threads_per_worker=args.threads,
+        tenant_weights=args.tenant_weights
+    ).start()
+    print(f"Started {args.workers} workers on {args.db}")
+    try:
+        while pool.alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        pool.stop()
@@ -0,0 +1,425 @@
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+
+import numpy as np
+
+LABELS = ("credible", "misinformation")
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+DEFAULT_MODEL_PATH = "data/triage_model.npz"
+# Floors under the learned thresholds: below these the local model never
+# replaces (or cuts down) the Cortex fan-out, however good it looked offline
+MIN_SKIP_THRESHOLD = 0.9
+MIN_SHORTEN_THRESHOLD = 0.7
+
+
+def tokenize(text):
+    """Lowercased word unigrams and bigrams"""
+    words = TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+class TriageModel:
+    """
+    Local pre-screening classifier: TF-IDF features and a logistic regression.
+
+    Scores content as the calibrated probability that it is misinformation.
+    When the model is confident enough the Cortex fan-out can be skipped
+    entirely (skip_threshold) or cut down to a single model
+    (shorten_threshold).
+    """
+
+    def __init__(self, vocabulary, idf, weights, bias, calibration=(1.0, 0.0),
+                 skip_threshold=0.98, shorten_threshold=0.9):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.calibration = calibration
+        self.skip_threshold = skip_threshold
+        self.shorten_threshold = shorten_threshold
+
+    @classmethod
+    def train(cls, texts, labels, max_features=50000, min_df=2, l2=1e-4, epochs=300, learning_rate=1.0):
+        """Fit vocabulary, IDF and weights on texts labelled 0 (credible) / 1 (misinformation)"""
+        docs = [tokenize(text) for text in texts]
+        y = np.asarray(labels, dtype=np.float64)
+
+        doc_freq = Counter()
+        for tokens in docs:
+            doc_freq.update(set(tokens))
+        kept = [token for token, n in doc_freq.most_common(max_features) if n >= min_df]
+        vocabulary = {token: i for i, token in enumerate(kept)}
+        counts = np.array([doc_freq[token] for token in kept], dtype=np.float64)
+        idf = np.log((1 + len(docs)) / (1 + counts)) + 1
+
+        model = cls(vocabulary, idf, np.zeros(len(kept)), 0.0)
+        X = model._matrix(docs)
+
+        # Balance the classes so a skewed history does not bias every score
+        positives = max(y.sum(), 1.0)
+        negatives = max(len(y) - y.sum(), 1.0)
+        sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+        w = np.zeros(len(kept))
+        b = 0.0
+        for _ in range(epochs):
+            residual = (_sigmoid(model._decision(X, w, b)) - y) * sample_weight
+            grad_w = X.transpose_dot(residual) / len(y) + l2 * w
+            grad_b = residual.mean()
+            w -= learning_rate * grad_w
+            b -= learning_rate * grad_b
+
+        model.weights = w
+        model.bias = b
+        return model
+
+    def calibrate(self, texts, labels, iterations=50):
+        """
+        Platt scaling on held-out examples.
+
+        Fits probability = sigmoid(a * raw_score + b) with Newton's method
+        so that confidence thresholds mean what they say.
+        """
+        z = self.decision_function(texts)
+        y = np.asarray(labels, dtype=np.float64)
+        positives = y.sum()
+        negatives = len(y) - positives
+        # Platt's smoothed targets avoid overconfidence on small holdouts
+        target = np.where(y == 1, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+        a, b = 1.0, 0.0
+        for _ in range(iterations):
+            p = _sigmoid(a * z + b)
+            d = p * (1 - p) + 1e-12
+            grad = np.array([np.dot(p - target, z), np.sum(p - target)])
+            hessian = np.array([
+                [np.dot(d, z * z) + 1e-9, np.dot(d, z)],
+                [np.dot(d, z), np.sum(d) + 1e-9]
+            ])
+            step = np.linalg.solve(hessian, grad)
+            a, b = a - step[0], b - step[1]
+            if np.abs(step).max() < 1e-8:
+                break
+
+        self.calibration = (float(a), float(b))
+        return self.calibration
+
+    def _vectorize(self, tokens):
+        counts = Counter(self.vocabulary[token] for token in tokens if token in self.vocabulary)
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[indices]
+        norm = np.sqrt(np.dot(values, values))
+        return indices, (values / norm if norm else values)
+
+    def _matrix(self, docs):
+        rows = [self._vectorize(tokens) for tokens in docs]
+        return _SparseRows(rows, len(self.vocabulary))
+
+    def _decision(self, X, w, b):
+        return X.dot(w) + b
+
+    def decision_function(self, texts):
+        """Uncalibrated scores for a list of texts"""
+        return self._decision(self._matrix([tokenize(text) for text in texts]), self.weights, self.bias)
+
+    def predict_proba(self, texts):
+        """Calibrated probability of misinformation for each text"""
+        a, b = self.calibration
+        return _sigmoid(a * self.decision_function(texts) + b)
+
+    def score(self, text):
+        """Calibrated probability of misinformation for one text"""
+        return self._probability(*self._vectorize(tokenize(text)))
+
+    def _probability(self, indices, values):
+        a, b = self.calibration
+        z = np.dot(values, self.weights[indices]) + self.bias
+        return float(_sigmoid(a * z + b))
+
+    def triage(self, text):
+        """
+        Decide whether content needs the full model fan-out.
+
+        Content with no words the model has seen always gets the full
+        fan-out: its score is just the bias, not evidence.
+        """
+        indices, values = self._vectorize(tokenize(text))
+        probability = self._probability(indices, values)
+        confidence = max(probability, 1 - probability)
+        if not len(indices):
+            action = "full"
+        elif confidence >= max(self.skip_threshold, MIN_SKIP_THRESHOLD):
+            action = "skip"
+        elif confidence >= max(self.shorten_threshold, MIN_SHORTEN_THRESHOLD):
+            action = "shorten"
+        else:
+            action = "full"
+        return {
+            "label": LABELS[int(probability >= 0.5)],
+            "probability": round(probability, 4),
+            "confidence": round(confidence, 4),
+            "action": action
+        }
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tokens = sorted(self.vocabulary, key=self.vocabulary.get)
+        meta = {
+            "bias": self.bias,
+            "calibration": list(self.calibration),
+            "skip_threshold": self.skip_threshold,
+            "shorten_threshold": self.shorten_threshold,
+            "trained_at": time.time()
+        }
+        np.savez_compressed(
+            path,
+            tokens=np.array(tokens, dtype=str),
+            idf=self.idf,
+            weights=self.weights,
+            meta=np.array(json.dumps(meta))
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            vocabulary = {str(token): i for i, token in enumerate(data["tokens"])}
+            return cls(
+                vocabulary,
+                data["idf"],
+                data["weights"],
+                meta["bias"],
+                tuple(meta["calibration"]),
+                meta["skip_threshold"],
+                meta["shorten_threshold"]
+            )
+
+
+class _SparseRows:
+    """Row-compressed matrix with just the two products training needs"""
+
+    def __init__(self, rows, n_features):
+        lengths = np.array([len(indices) for indices, _ in rows], dtype=np.int64)
+        self.n_rows = len(rows)
+        self.n_features = n_features
+        self.indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, np.int64)
+        self.values = np.concatenate([values for _, values in rows]) if rows else np.zeros(0)
+        self.row_ids = np.repeat(np.arange(self.n_rows), lengths)
+
+    def dot(self, w):
+        return np.bincount(self.row_ids, weights=self.values * w[self.indices], minlength=self.n_rows)
+
+    def transpose_dot(self, r):
+        return np.bincount(self.indices, weights=self.values * r[self.row_ids], minlength=self.n_features)
+
+
+def load_examples(logs_file="logs/analysis_logs.jsonl"):
+    """
+    Collect (category, content, label) from completed analyses in the log.
+
+    The label comes from the models' mean credibility score when they gave
+    one (below 40 is misinformation, above 60 credible, in between is
+    dropped as ambiguous), otherwise from the consensus verdict.
+    """
+    examples = []
+    if not os.path.exists(logs_file):
+        return examples
+
+    with open(logs_file, "r") as f:
+        for line in f:
+            try:
+                metadata = json.loads(line).get("metadata") or {}
+            except json.JSONDecodeError:
+                continue
+            content = metadata.get("content")
+            if not content:
+                continue
+            # Verdicts the triage model made on its own would only teach it its own mistakes
+            if (metadata.get("triage") or {}).get("action") == "skip":
+                continue
+
+            scores = [s for s in (metadata.get("scores") or {}).values() if s is not None]
+            if scores:
+                mean = sum(scores) / len(scores)
+                label = 1 if mean < 40 else 0 if mean > 60 else None
+            else:
+                verdict = metadata.get("verdict")
+                label = LABELS.index(verdict) if verdict in LABELS else None
+
+            if label is not None:
+                examples.append((metadata.get("category", ""), content, label))
+    return examples
+
+
+def evaluate(model, texts, labels, thresholds=None):
+    """
+    Offline evaluation report for choosing the confidence threshold.
+
+    For each threshold, reports the share of content that would bypass the
+    full fan-out (coverage) and how often those confident calls are wrong.
+    """
+    y = np.asarray(labels, dtype=np.int64)
+    p = model.predict_proba(texts)
+    predicted = (p >= 0.5).astype(np.int64)
+    confidence = np.maximum(p, 1 - p)
+    correct = predicted == y
+
+    start = time.perf_counter()
+    for text in texts[:1000]:
+        model.score(text)
+    score_us = 1e6 * (time.perf_counter() - start) / max(min(len(texts), 1000), 1)
+
+    # Rank-based AUC
+    order = np.argsort(p)
+    ranks = np.empty(len(p))
+    ranks[order] = np.arange(1, len(p) + 1)
+    positives = y.sum()
+    negatives = len(y) - positives
+    auc = None
+    if positives and negatives:
+        auc = float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+    # Expected calibration error over ten confidence bins
+    bins = np.minimum((confidence - 0.5) * 20, 9).astype(np.int64)
+    bin_counts = np.bincount(bins, minlength=10)
+    bin_errors = np.bincount(bins, weights=~correct, minlength=10)
+    bin_gap = np.abs(np.bincount(bins, weights=confidence, minlength=10) - np.bincount(bins, weights=correct, minlength=10))
+    ece = float(bin_gap.sum() / len(y)) if len(y) else None
+
+    if thresholds is None:
+        thresholds = np.round(np.arange(0.5, 1.0, 0.01), 2)
+    table = []
+    for threshold in thresholds:
+        covered = confidence >= threshold
+        n_covered = int(covered.sum())
+        table.append({
+            "threshold": float(threshold),
+            "coverage": round(n_covered / len(y), 4) if len(y) else 0.0,
+            "error_rate": round(float((~correct[covered]).mean()), 4) if n_covered else None,
+            "covered": n_covered
+        })
+
+    return {
+        "examples": int(len(y)),
+        "misinformation_share": round(float(y.mean()), 4) if len(y) else None,
+        "accuracy": round(float(correct.mean()), 4) if len(y) else None,
+        "auc": round(auc, 4) if auc is not None else None,
+        "brier": round(float(np.mean((p - y) ** 2)), 4) if len(y) else None,
+        "ece": round(ece, 4) if ece is not None else None,
+        "reliability": [
+            {
+                "confidence_bin": round(0.5 + i * 0.05, 2),
+                "count": int(bin_counts[i]),
+                "error_rate": round(float(bin_errors[i] / bin_counts[i]), 4) if bin_counts[i] else None
+            }
+            for i in range(10)
+        ],
+        "score_latency_us": round(score_us, 1),
+        "thresholds": table
+    }
+
+
+def recommend_threshold(report, max_error=0.02, min_covered=20, min_threshold=0.5):
+    """
+    Lowest confidence from which every 0.05-wide confidence band, on its
+    own, stays within max_error; None if even the top band does not.
+
+    Bands are judged separately so that many easy, very confident examples
+    cannot hide a band of poor calls just above the threshold. Walking down
+    from the top, a band with fewer than min_covered examples or too many
+    errors ends the search, as does reaching min_threshold.
+    """
+    threshold = None
+    for band in reversed(report["reliability"]):
+        if band["confidence_bin"] < min_threshold:
+            break
+        if band["count"] < min_covered or band["error_rate"] > max_error:
+            break
+        threshold = band["confidence_bin"]
+    return threshold
+
+
+def _split(examples):
+    """
+    70 / 15 / 15 train, calibration and test splits, fixed per content.
+
+    The split is a hash of the content rather than a shuffle, so as the log
+    grows an example never moves between splits: calibrate and evaluate on
+    a later log never see the model's training data, and reposts of the
+    same content always land in the same split.
+    """
+    splits = ([], [], [])
+    for _, content, label in examples:
+        bucket = int(hashlib.sha256(content.encode("utf-8")).hexdigest()[:8], 16) % 100
+        splits[0 if bucket < 70 else 1 if bucket < 85 else 2].append((content, label))
+    return tuple(([c for c, _ in split], [l for _, l in split]) for split in splits)
+
+
+def _print_report(report):
+    print(f"Examples: {report['examples']}  Accuracy: {report['accuracy']}  AUC: {report['auc']}  "
+          f"Brier: {report['brier']}  ECE: {report['ece']}  Score: {report['score_latency_us']}us")
+    print(f"{'threshold':>10} {'coverage':>10} {'error':>8} {'covered':>8}")
+    for row in report["thresholds"][::5]:
+        print(f"{row['threshold']:>10} {row['coverage']:>10} {str(row['error_rate']):>8} {row['covered']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train, calibrate and evaluate the local triage model")
+    parser.add_argument("command", choices=["train", "calibrate", "evaluate"])
+    parser.add_argument("--logs", default="logs/analysis_logs.jsonl", help="Analysis log to learn from")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Where the model is stored")
+    parser.add_argument("--report", default="data/triage_report.json", help="Where to write the evaluation report")
+    parser.add_argument("--max-error", type=float, default=0.02, help="Error budget for skipping all models")
+    parser.add_argument("--shorten-max-error", type=float, default=0.1, help="Error budget for using a single model")
+    args = parser.parse_args()
+
+    examples = load_examples(args.logs)
+    if len(examples) < 50:
+        raise SystemExit(f"Only {len(examples)} labelled analyses in {args.logs}; need at least 50")
+
+    train_set, calib_set, test_set = _split(examples)
+    if args.command == "train":
+        model = TriageModel.train(*train_set)
+        model.calibrate(*calib_set)
+    elif args.command == "calibrate":
+        model = TriageModel.load(args.model)
+        model.calibrate(*calib_set)
+    else:
+        model = TriageModel.load(args.model)
+
+    if args.command != "evaluate":
+        # Thresholds come from the calibration split so the test split stays an
+        # unbiased estimate; with no safe threshold the stage is disabled
+        calib_report = evaluate(model, *calib_set)
+        model.skip_threshold = recommend_threshold(
+            calib_report, args.max_error, min_threshold=MIN_SKIP_THRESHOLD
+        ) or 1.01
+        model.shorten_threshold = min(
+            recommend_threshold(calib_report, args.shorten_max_error, min_threshold=MIN_SHORTEN_THRESHOLD) or 1.01,
+            model.skip_threshold
+        )
+
+    report = evaluate(model, *test_set)
+    _print_report(report)
+
+    if args.command != "evaluate":
+        model.save(args.model)
+        report["skip_threshold"] = model.skip_threshold
+        report["shorten_threshold"] = model.shorten_threshold
+        print(f"Saved {args.model}: skip >= {model.skip_threshold}, shorten >= {model.shorten_threshold}")
+
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
@@ -1,29 +1,81 @@
+import os
 import time
 import json
-from src.api.snowflake_cortex import SnowflakeCortexClient
+from src.api.cortex_pool import CortexAccountPool
+from src.api.cortex_scheduler import CortexScheduler
+from src.models.triage import TriageModel, DEFAULT_MODEL_PATH
+from src.utils.cancellation import CancelledError
+
+# Models queried for each content category
+MODEL_CATEGORIES = {
+    "news": ["mistral-large2", "llama3.1-70b"],
+    "deepfake": ["claude-3-5-sonnet", "llama3.1-70b"],
+    "election": ["mistral-large2", "claude-3-5-sonnet"],
+    "climate": ["llama3.1-70b", "claude-3-5-sonnet"],
+    "viral": ["mistral-large2", "llama3.1-70b"],
+    "mental health": ["llama3.1-70b", "mistral-large2"]
+}
 
 class VerificationEngine:
-    def __init__(self):
-        self.client = SnowflakeCortexClient()
-        self.model_categories = {
-            "news": ["mistral-large2", "llama3.1-70b"],
-            "deepfake": ["claude-3-5-sonnet", "llama3.1-70b"],
-            "election": ["mistral-large2", "claude-3-5-sonnet"],
-            "climate": ["llama3.1-70b", "claude-3-5-sonnet"],
-            "viral": ["mistral-large2", "llama3.1-70b"],
-            "mental health": ["llama3.1-70b", "mistral-large2"]
-        }
-
-    def verify(self, category, content):
-        """Run verification across multiple models"""
+    def __init__(self, scheduler=None, triage=None, slots=None, tenant_weights=None):
+        # slots (a SharedSlots) makes model budgets and account limits global across worker processes
+        self.client = CortexAccountPool.from_env(slots=slots)
+        self.scheduler = scheduler or CortexScheduler(self.client, tenant_weights=tenant_weights, slots=slots)
+        self.triage = triage if triage is not None else self._load_triage()
+        self.model_categories = dict(MODEL_CATEGORIES)
+
+    def _load_triage(self):
+        """Load the local triage model if one has been trained"""
+        path = os.getenv("TRIAGE_MODEL", DEFAULT_MODEL_PATH)
+        if not os.path.exists(path):
+            return None
+        try:
+            return TriageModel.load(path)
+        except Exception as e:
+            print(f"Warning: Could not load triage model: {str(e)}")
+            return None
+
+    def verify(self, category, content, priority="interactive", tenant="default", cancel_token=None):
+        """
+        Run verification across multiple models
+
+        If cancel_token is cancelled or its deadline passes, in-flight model
+        streams are closed and whatever was gathered so far is returned, with
+        the reason under "cancelled".
+        """
         category = category.lower().strip()
         
         if category not in self.model_categories:
             raise ValueError(f"Unknown category: {category}. Valid: {list(self.model_categories.keys())}")
 
+        models = self.model_categories[category]
+        triage = self.triage.triage(content) if self.triage else None
+        
+        if triage and triage["action"] == "skip":
+            return {
+                "individual_responses": {},
+                "consensus_analysis": (
+                    f"Local triage: likely {triage['label']} "
+                    f"({triage['confidence']:.0%} confidence). Cortex models were skipped."
+                ),
+                "queue_wait_ms": {},
+                "latency_ms": {},
+                "triage": triage,
+                "cancelled": None
+            }
+        if triage and triage["action"] == "shorten":
+            models = models[:1]
+
         results = {}
+        queue_wait_ms = {}
+        latency_ms = {}
+        cancelled = None
         
-        for model_name in self.model_categories[category]:
+        for model_name in models:
+            if cancel_token is not None and cancel_token.cancelled:
+                cancelled = cancel_token.reason
+                break
+            
             prompt = (
                 f"Analyze this {category} content for misinformation. "
                 f"Give a credibility score (0-100) and brief reasoning.\n\n"
@@ -33,12 +85,36 @@ class VerificationEngine:
             
             try:
                 print(f"  Querying {model_name}...")
-                response = self.client.complete(model_name, messages, max_tokens=512)
+                with self.scheduler.slot(model_name, priority, tenant, cancel_token) as wait_seconds:
+                    queue_wait_ms[model_name] = round(wait_seconds * 1000, 1)
+                    started = time.perf_counter()
+                    response = self.client.complete(
+                        model_name, messages, max_tokens=512, cancel_token=cancel_token
+                    )
+                    latency_ms[model_name] = round((time.perf_counter() - started) * 1000, 1)
                 results[model_name] = response
+            except CancelledError as e:
+                if e.partial:
+                    results[model_name] = f"{e.partial}\n\n[Partial response: {e.reason}]"
+                cancelled = e.reason
+                break
             except Exception as e:
                 results[model_name] = f"Error: {str(e)}"
             
-            time.sleep(0.5)
+            if cancel_token is not None:
+                cancel_token.wait(0.5)
+            else:
+                time.sleep(0.5)
+
+        if cancelled:
+            return {
+                "individual_responses": results,
+                "consensus_analysis": f"Analysis stopped early ({cancelled}); no consensus was generated.",
+                "queue_wait_ms": queue_wait_ms,
+                "latency_ms": latency_ms,
+                "triage": triage,
+                "cancelled": cancelled
+            }
 
         # Consensus
         consensus_prompt = (
@@ -49,15 +125,27 @@ class VerificationEngine:
         consensus_messages = [{"role": "user", "content": consensus_prompt}]
         
         try:
-            consensus_result = self.client.complete(
+            consensus_result = self.scheduler.complete(
                 "claude-3-5-sonnet", 
                 consensus_messages, 
-                max_tokens=1024
+                priority=priority,
+                tenant=tenant,
+                max_tokens=1024,
+                cancel_token=cancel_token
             )
+        except CancelledError as e:
+            cancelled = e.reason
+            consensus_result = f"Analysis stopped early ({e.reason}) while generating consensus."
+            if e.partial:
+                consensus_result += f"\n\n{e.partial}"
         except Exception as e:
             consensus_result = f"Error generating consensus: {str(e)}"
 
         return {
             "individual_responses": results,
-            "consensus_analysis": consensus_result
+            "consensus_analysis": consensus_result,
+            "queue_wait_ms": queue_wait_ms,
+            "latency_ms": latency_ms,
+            "triage": triage,
+            "cancelled": cancelled
         }
\ No newline at end of file
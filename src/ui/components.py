@@ -1,5 +1,13 @@
+import time
 import streamlit as st
 
+LOG_ICONS = {
+    "info": "ℹ️",
+    "warning": "⚠️",
+    "error": "❌",
+    "success": "✅"
+}
+
 def metric_card(title, value, delta="", color="#00C9A7"):
     """Display an enhanced metric card with animations"""
     st.markdown(f"""
@@ -12,13 +20,7 @@ def metric_card(title, value, delta="", color="#00C9A7"):
 
 def alert_box(message, alert_type="info"):
     """Display an enhanced alert box"""
-    icons = {
-        "info": "ℹ️",
-        "warning": "⚠️",
-        "error": "❌",
-        "success": "✅"
-    }
-    icon = icons.get(alert_type, "ℹ️")
+    icon = LOG_ICONS.get(alert_type, "ℹ️")
     
     st.markdown(f"""
         <div class="alert-box alert-{alert_type}">
@@ -41,4 +43,31 @@ def progress_bar(current, total, label="Progress"):
                 </div>
             </div>
         </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+class LiveLog:
+    """
+    Append-only log panel for streaming progress messages.
+
+    Each message is rendered as its own element inside the container, so
+    adding a line costs the same no matter how long the log already is.
+    """
+
+    def __init__(self, container, lines=None):
+        self.container = container
+        self.lines = lines if lines is not None else []
+
+    def add(self, message, log_type="info"):
+        """Append a single timestamped line to the log"""
+        timestamp = time.strftime("%H:%M:%S")
+        icon = LOG_ICONS.get(log_type, "ℹ️")
+        entry = f"{icon} [{timestamp}] {message}"
+        self.lines.append(entry)
+        self.container.text(entry)
+        return entry
+
+
+def log_panel(lines):
+    """Render a finished log in one element"""
+    if lines:
+        st.code("\n".join(lines), language=None)
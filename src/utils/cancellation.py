@@ -0,0 +1,96 @@
+import time
+import threading
+
+
+class CancelledError(Exception):
+    """Work was cancelled or ran past its deadline"""
+
+    def __init__(self, reason="Cancelled", partial=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.partial = partial
+
+
+class CancellationToken:
+    """
+    Cancellation signal with an optional deadline, shared by everything
+    working on one request.
+
+    Code doing blocking I/O registers a callback with on_cancel (for example
+    closing an HTTP response) so cancellation interrupts it immediately
+    instead of waiting for the next check. Reaching the deadline cancels the
+    token with reason "Deadline exceeded".
+    """
+
+    def __init__(self, timeout=None, deadline=None):
+        if deadline is None and timeout is not None:
+            deadline = time.time() + timeout
+        self.deadline = deadline
+        self.reason = None
+
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks = {}
+        self._next_key = 0
+        self._timer = None
+
+        if self.deadline is not None:
+            self._timer = threading.Timer(max(self.deadline - time.time(), 0), self.cancel, args=("Deadline exceeded",))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self, reason="Cancelled"):
+        """Cancel the token and run every registered callback once"""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+            self._event.set()
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.deadline is not None and time.time() >= self.deadline:
+            self.cancel("Deadline exceeded")
+        return self._event.is_set()
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.time(), 0.0)
+
+    def raise_if_cancelled(self, partial=None):
+        if self.cancelled:
+            raise CancelledError(self.reason, partial=partial)
+
+    def wait(self, timeout=None):
+        """Sleep up to timeout seconds, waking early on cancellation. Returns True if cancelled."""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """Register a callback for cancellation; returns a key for remove()"""
+        with self._lock:
+            if self.reason is None:
+                key = self._next_key
+                self._next_key += 1
+                self._callbacks[key] = callback
+                return key
+        callback()
+        return None
+
+    def remove(self, key):
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    def close(self):
+        """Stop the deadline timer once the work is finished"""
+        if self._timer is not None:
+            self._timer.cancel()
@@ -0,0 +1,44 @@
+import re
+
+# Models often echo the prompt's "credibility score (0-100)" before the
+# number, so the range is skipped rather than read as a score of 0
+SCORE_PATTERN = re.compile(
+    r"credibility score(?:\s*\(\s*0\s*[-–]\s*100\s*\))?\D{0,20}?(\d{1,3})",
+    re.IGNORECASE
+)
+
+# "not credible", "not entirely true", "untrue", ... must not count as credible
+NEGATED_PATTERN = re.compile(
+    r"\b(?:un|(?:not|never|isn't|is not|aren't|hardly)\s+(?:\w+\s+)?)(?:credible|true)\b"
+)
+CREDIBLE_PATTERN = re.compile(r"\b(?:credible|true)\b")
+MISINFORMATION_PATTERN = re.compile(r"misinformation|\bfalse\b")
+
+
+def verdict_label(consensus):
+    """
+    Map a consensus text to "credible", "misinformation" or None.
+
+    Uses the results view's keywords, but a negated "credible"/"true"
+    counts against the content, and a text that points both ways is None
+    so it is never used as a training label.
+    """
+    text = (consensus or "").lower()
+    negated = bool(NEGATED_PATTERN.search(text))
+    credible = bool(CREDIBLE_PATTERN.search(NEGATED_PATTERN.sub(" ", text)))
+    misinformation = negated or bool(MISINFORMATION_PATTERN.search(text))
+
+    if credible and not misinformation:
+        return "credible"
+    if misinformation and not credible:
+        return "misinformation"
+    return None
+
+
+def credibility_score(response):
+    """Pull the 0-100 credibility score out of a model response, or None"""
+    match = SCORE_PATTERN.search(response or "")
+    if not match:
+        return None
+    score = int(match.group(1))
+    return score if 0 <= score <= 100 else None
@@ -0,0 +1,491 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+
+from src.api.cortex_scheduler import PRIORITIES
+
+
+class JobQueue:
+    """
+    Durable local job queue for verification requests, stored in SQLite.
+
+    Jobs are leased to a worker for a visibility timeout. A worker that
+    crashes or stalls loses its lease and the job becomes visible again,
+    so every job is delivered at least once until it completes or runs out
+    of attempts.
+
+    Interactive jobs are always claimed before batch jobs; within a priority
+    the tenant with the fewest running jobs goes first.
+
+    A job can be cancelled, can carry a deadline, and can be "watched": a
+    watched job is abandoned when its client stops polling for watch_timeout
+    seconds. Queued jobs are cancelled straight away; running jobs are
+    flagged and their worker stops them.
+    """
+
+    STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+    def __init__(self, db_path="jobs/jobs.db", max_attempts=3, visibility_timeout=120, watch_timeout=30):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.watch_timeout = watch_timeout
+
+        # Create jobs directory if it doesn't exist
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    priority TEXT NOT NULL DEFAULT 'interactive',
+                    tenant TEXT NOT NULL DEFAULT 'default',
+                    status TEXT NOT NULL,
+                    deadline REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    cancel_reason TEXT,
+                    watched_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    visible_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    updated_at REAL NOT NULL,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+            # Queues created before priorities existed
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (
+                ("priority", "TEXT NOT NULL DEFAULT 'interactive'"),
+                ("tenant", "TEXT NOT NULL DEFAULT 'default'"),
+                ("started_at", "REAL"),
+                ("deadline", "REAL"),
+                ("cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+                ("cancel_reason", "TEXT"),
+                ("watched_at", "REAL"),
+            ):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at, created_at)"
+            )
+            # Claims walk one tenant's oldest jobs per priority and count running jobs per tenant
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, tenant, created_at)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_tenant ON jobs (status, tenant)")
+            # Only queued jobs with a deadline or a watcher can expire in the queue
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queued_deadline ON jobs (deadline) "
+                "WHERE status = 'queued' AND deadline IS NOT NULL"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queued_watched ON jobs (watched_at) "
+                "WHERE status = 'queued' AND watched_at IS NOT NULL"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS worker_stats (
+                    worker_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    stats TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # One short-lived connection per call keeps the queue safe to share
+        # between threads and worker processes.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    def submit(self, category, content, max_attempts=None, priority="interactive", tenant="default",
+               deadline=None, watched=False):
+        """
+        Add a verification job and return its id
+
+        deadline is a budget in seconds from now. A watched job must be
+        kept alive with touch() by the client waiting on it.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Valid: {list(PRIORITIES)}")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (job_id, category, content, priority, tenant, status, deadline,
+                                  watched_at, attempts, max_attempts, visible_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, 0, ?, ?, ?, ?)
+                """,
+                (job_id, category, content, priority, tenant,
+                 now + deadline if deadline else None, now if watched else None,
+                 max_attempts or self.max_attempts, now, now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id, visibility_timeout=None):
+        """
+        Lease the next visible job to a worker.
+
+        Returns the job as a dict, or None if nothing is ready. Running jobs
+        whose lease has expired are handed out again; those that have used
+        all their attempts are marked failed instead. Jobs that were
+        cancelled, ran past their deadline or were abandoned are never
+        handed out.
+
+        Every step reads through an index, so an idle poll or a claim
+        against a large backlog costs a handful of index lookups rather
+        than a scan of the queue.
+        """
+        timeout = visibility_timeout or self.visibility_timeout
+        now = time.time()
+        with self._connect() as conn:
+            # Idle workers poll often: only take the write lock when there is work
+            ready = conn.execute(
+                """
+                SELECT 1 FROM jobs
+                WHERE status IN ('queued', 'running') AND visible_at <= ?
+                LIMIT 1
+                """,
+                (now,)
+            ).fetchone()
+            if ready is None:
+                return None
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sweep(conn, now)
+                job_id = self._next_job(conn, now)
+                if job_id is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                conn.execute(
+                    """
+                    UPDATE jobs
+                    SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                        visible_at = ?, started_at = COALESCE(started_at, ?), updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (worker_id, now + timeout, now, now, job_id)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return self.get(job_id)
+
+    def _sweep(self, conn, now):
+        # Settle expired leases and jobs that expired in the queue. Called inside
+        # the claim transaction; every UPDATE only touches rows an index selects
+        # (INDEXED BY where the planner would otherwise pick jobs_ready and scan).
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'failed', lease_owner = NULL, updated_at = ?,
+                error = 'Lease expired after final attempt'
+            WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts
+            """,
+            (now, now)
+        )
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'cancelled', lease_owner = NULL, updated_at = ?,
+                error = CASE
+                    WHEN cancel_requested = 1 THEN COALESCE(cancel_reason, 'Cancelled')
+                    WHEN deadline IS NOT NULL AND deadline <= ? THEN 'Deadline exceeded'
+                    ELSE 'Abandoned: nobody is waiting for the result'
+                END
+            WHERE status = 'running' AND visible_at <= ?
+              AND (cancel_requested = 1
+                   OR (deadline IS NOT NULL AND deadline <= ?)
+                   OR (watched_at IS NOT NULL AND watched_at <= ?))
+            """,
+            (now, now, now, now, now - self.watch_timeout)
+        )
+        # Whatever is left of the expired leases goes back in the queue for redelivery
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'queued', lease_owner = NULL, updated_at = ?,
+                error = COALESCE(error, 'Lease expired')
+            WHERE status = 'running' AND visible_at <= ?
+            """,
+            (now, now)
+        )
+        conn.execute(
+            """
+            UPDATE jobs INDEXED BY jobs_queued_deadline
+            SET status = 'cancelled', updated_at = ?, error = 'Deadline exceeded'
+            WHERE status = 'queued' AND deadline IS NOT NULL AND deadline <= ?
+            """,
+            (now, now)
+        )
+        conn.execute(
+            """
+            UPDATE jobs INDEXED BY jobs_queued_watched
+            SET status = 'cancelled', updated_at = ?,
+                error = 'Abandoned: nobody is waiting for the result'
+            WHERE status = 'queued' AND watched_at IS NOT NULL AND watched_at <= ?
+            """,
+            (now, now - self.watch_timeout)
+        )
+
+    def _next_job(self, conn, now):
+        # Interactive before batch; within a priority, the tenant with the fewest
+        # running jobs, then the oldest job. Running counts are computed once per
+        # claim and each tenant's oldest ready job is a single index seek.
+        busy = {
+            row["tenant"]: row["n"]
+            for row in conn.execute(
+                "SELECT tenant, COUNT(*) AS n FROM jobs WHERE status = 'running' GROUP BY tenant"
+            )
+        }
+        for priority in PRIORITIES:
+            heads = []
+            for tenant in self._queued_tenants(conn, priority):
+                row = conn.execute(
+                    """
+                    SELECT job_id, created_at FROM jobs INDEXED BY jobs_claim
+                    WHERE status = 'queued' AND priority = ? AND tenant = ? AND visible_at <= ?
+                      AND cancel_requested = 0
+                    ORDER BY created_at
+                    LIMIT 1
+                    """,
+                    (priority, tenant, now)
+                ).fetchone()
+                if row is not None:
+                    heads.append((busy.get(tenant, 0), row["created_at"], row["job_id"]))
+            if heads:
+                return min(heads)[2]
+        return None
+
+    def _queued_tenants(self, conn, priority):
+        # Distinct tenants with queued jobs, one index seek per tenant instead of a scan
+        rows = conn.execute(
+            """
+            WITH RECURSIVE tenants(tenant) AS (
+                SELECT MIN(tenant) FROM jobs WHERE status = 'queued' AND priority = ?
+                UNION ALL
+                SELECT (SELECT MIN(tenant) FROM jobs
+                        WHERE status = 'queued' AND priority = ? AND tenant > tenants.tenant)
+                FROM tenants WHERE tenants.tenant IS NOT NULL
+            )
+            SELECT tenant FROM tenants WHERE tenant IS NOT NULL
+            """,
+            (priority, priority)
+        ).fetchall()
+        return [row["tenant"] for row in rows]
+
+    def extend_lease(self, job_id, worker_id, visibility_timeout=None):
+        """Push back the visibility timeout of a job this worker still holds"""
+        timeout = visibility_timeout or self.visibility_timeout
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET visible_at = ?, updated_at = ?
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (now + timeout, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result, status="done", error=None):
+        """
+        Store the result of a job. Returns False if the lease was lost.
+
+        A job stopped early finishes as "cancelled" with its partial result.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs
+                SET status = ?, result = ?, error = ?, lease_owner = NULL, updated_at = ?
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (status, json.dumps(result), error, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id, reason="Cancelled by user"):
+        """
+        Cancel a job. Returns "cancelled" if it had not started yet,
+        "cancelling" if its worker has been asked to stop, or the job's
+        final status if it had already finished.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = 'cancelled', error = ?, cancel_reason = ?, updated_at = ?
+                WHERE job_id = ? AND status = 'queued'
+                """,
+                (reason, reason, now, job_id)
+            )
+            if cursor.rowcount:
+                return "cancelled"
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET cancel_requested = 1, cancel_reason = ?, updated_at = ?
+                WHERE job_id = ? AND status = 'running'
+                """,
+                (reason, now, job_id)
+            )
+            if cursor.rowcount:
+                return "cancelling"
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def touch(self, job_id):
+        """Tell the queue the client of a watched job is still waiting"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET watched_at = ? WHERE job_id = ? AND watched_at IS NOT NULL",
+                (time.time(), job_id)
+            )
+
+    def stop_reason(self, job_id):
+        """Why a running job should stop, or None if it should carry on"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cancel_requested, cancel_reason, deadline, watched_at FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if row["cancel_requested"]:
+            return row["cancel_reason"] or "Cancelled"
+        if row["deadline"] is not None and row["deadline"] <= now:
+            return "Deadline exceeded"
+        if row["watched_at"] is not None and row["watched_at"] <= now - self.watch_timeout:
+            return "Abandoned: nobody is waiting for the result"
+        return None
+
+    def fail(self, job_id, worker_id, error, retry_delay=5, permanent=False):
+        """
+        Record a failed attempt, re-queueing the job if it has attempts left.
+
+        A job that was cancelled while it ran finishes as "cancelled" with
+        the cancel reason instead of being retried.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs
+                SET status = CASE
+                        WHEN cancel_requested = 1 THEN 'cancelled'
+                        WHEN ? OR attempts >= max_attempts THEN 'failed'
+                        ELSE 'queued'
+                    END,
+                    error = CASE WHEN cancel_requested = 1 THEN COALESCE(cancel_reason, 'Cancelled') ELSE ? END,
+                    visible_at = ?, lease_owner = NULL, updated_at = ?
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (permanent, str(error), now + retry_delay, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id):
+        """Return the current state of a job, or None if it does not exist"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def status(self, job_id):
+        """Return the job state without its content or result"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        return {
+            key: job[key]
+            for key in ("job_id", "category", "priority", "tenant", "status", "attempts",
+                        "max_attempts", "deadline", "created_at", "started_at", "updated_at", "error")
+        }
+
+    def counts(self):
+        """Number of jobs in each status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in self.STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def record_worker_stats(self, worker_id, stats):
+        """Publish a worker process's scheduler and account stats for /metrics"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO worker_stats (worker_id, updated_at, stats) VALUES (?, ?, ?)",
+                (worker_id, time.time(), json.dumps(stats))
+            )
+
+    def worker_stats(self, max_age=300):
+        """Latest stats of every worker that reported in the last max_age seconds"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT worker_id, stats FROM worker_stats WHERE updated_at >= ?",
+                (time.time() - max_age,)
+            ).fetchall()
+        return {row["worker_id"]: json.loads(row["stats"]) for row in rows}
+
+    def metrics(self):
+        """Job counts and time spent queued before a worker picked the job up, per priority"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT priority, COUNT(*) AS n,
+                       AVG(started_at - created_at) AS mean_wait,
+                       MAX(started_at - created_at) AS max_wait
+                FROM jobs
+                WHERE started_at IS NOT NULL
+                GROUP BY priority
+                """
+            ).fetchall()
+        return {
+            "counts": self.counts(),
+            "queue_wait_ms": {
+                row["priority"]: {
+                    "count": row["n"],
+                    "mean": round(1000 * row["mean_wait"], 1),
+                    "max": round(1000 * row["max_wait"], 1),
+                }
+                for row in rows
+            },
+            "workers": self.worker_stats(),
+        }
+
+
+class _Closing:
+    """Context manager that closes a sqlite3 connection on exit"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+        return False
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import requests
+
+from src.utils.logger import AnalysisLogger
+
+TARGET_TABLE = "TRUTHGUARD_DB.VERIFICATION_ENGINE.CONTENT_ANALYSIS"
+
+# One statement per batch: the batch is bound as a single JSON array, expanded
+# with FLATTEN and merged on analysis_id, so replaying a batch inserts nothing twice.
+MERGE_STATEMENT = f"""
+MERGE INTO {TARGET_TABLE} AS t
+USING (
+    SELECT
+        f.value:analysis_id::STRING AS analysis_id,
+        f.value:entry:category::STRING AS content_type,
+        TRY_TO_TIMESTAMP_NTZ(f.value:entry:timestamp::STRING) AS submission_time,
+        f.value:entry:log_type::STRING AS verification_status,
+        f.value:entry AS analysis_details
+    FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) AS f
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY analysis_id ORDER BY f.index) = 1
+) AS s
+ON t.analysis_id = s.analysis_id
+WHEN NOT MATCHED THEN INSERT
+    (analysis_id, content_type, submission_time, verification_status, analysis_details)
+VALUES
+    (s.analysis_id, s.content_type, s.submission_time, s.verification_status, s.analysis_details)
+"""
+
+# Entries written before analysis_id existed were inserted live with a random
+# UUID_STRING() id, so they go through their own MERGE keyed on content_type and
+# the logged timestamp. Both conditions are equalities, so Snowflake can still
+# hash-join the batch against the table; backfilling old history does not
+# duplicate them.
+LEGACY_MERGE_STATEMENT = f"""
+MERGE INTO {TARGET_TABLE} AS t
+USING (
+    SELECT
+        f.value:analysis_id::STRING AS analysis_id,
+        f.value:entry:category::STRING AS content_type,
+        f.value:entry:timestamp::STRING AS logged_at,
+        TRY_TO_TIMESTAMP_NTZ(f.value:entry:timestamp::STRING) AS submission_time,
+        f.value:entry:log_type::STRING AS verification_status,
+        f.value:entry AS analysis_details
+    FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) AS f
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY content_type, logged_at ORDER BY f.index) = 1
+) AS s
+ON t.content_type = s.content_type
+   AND t.analysis_details:timestamp::STRING = s.logged_at
+WHEN NOT MATCHED THEN INSERT
+    (analysis_id, content_type, submission_time, verification_status, analysis_details)
+VALUES
+    (s.analysis_id, s.content_type, s.submission_time, s.verification_status, s.analysis_details)
+"""
+
+
+class LogSyncEngine:
+    """
+    Ships the local JSONL analysis log to Snowflake in bulk.
+
+    A watermark records the byte offset of the log that Snowflake already
+    has. Each sync reads forward from the watermark in large batches,
+    submits one asynchronous MERGE per batch through the SQL API, polls it
+    to completion and only then advances the watermark. Entries are keyed by
+    analysis_id, so a batch that is retried after a crash or timeout never
+    produces duplicate rows.
+    """
+
+    def __init__(self, logger=None, state_file="logs/sync_state.json",
+                 batch_size=10000, max_batch_bytes=8 * 1024 * 1024):
+        self.logger = logger or AnalysisLogger()
+        self.logs_file = self.logger.logs_file
+        self.state_file = state_file
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+
+    def _read_state(self):
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def fingerprint(self, path=None):
+        """
+        Identity of a log file (the current log by default): its inode and a
+        hash of its first line. Changes when the log is cleared or rotated,
+        even if the new file has already grown past the old watermark.
+        """
+        path = path or self.logs_file
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            first_line = f.readline()
+        return {
+            "inode": os.stat(path).st_ino,
+            "first_line": hashlib.sha256(first_line).hexdigest()
+        }
+
+    def _replaced(self, state):
+        # Whether the watermark belongs to a log that has since been cleared or rotated
+        size = os.path.getsize(self.logs_file) if os.path.exists(self.logs_file) else 0
+        offset = state.get("offset", 0)
+        if offset > size:
+            return True
+        return bool(offset) and "fingerprint" in state and state["fingerprint"] != self.fingerprint()
+
+    def load_watermark(self):
+        """Byte offset of the first unsynced line"""
+        state = self._read_state()
+        # The log was cleared or rotated since the last sync: start over
+        return 0 if self._replaced(state) else state.get("offset", 0)
+
+    def previous_log(self, state):
+        """
+        Find the file the watermark was taken on after a rotation (a file in
+        the log directory with the recorded inode and first line), or None
+        if it was deleted.
+        """
+        fingerprint = state.get("fingerprint")
+        if not fingerprint:
+            return None
+        directory = os.path.dirname(self.logs_file) or "."
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.abspath(path) == os.path.abspath(self.logs_file) or not os.path.isfile(path):
+                continue
+            if self.fingerprint(path) == fingerprint:
+                return path
+        return None
+
+    def save_watermark(self, offset, rows):
+        """Persist the watermark, the log's fingerprint and the running row count atomically"""
+        state = {
+            "offset": offset,
+            "fingerprint": self.fingerprint(),
+            "rows_synced": rows,
+            "updated_at": time.time()
+        }
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def pending_batches(self, offset, path=None):
+        """
+        Yield (end_offset, entries) batches of unsynced log entries from the
+        log (or another file given by path).
+
+        Only complete lines are read, so a line still being written is left
+        for the next sync.
+        """
+        path = path or self.logs_file
+        if not os.path.exists(path):
+            return
+
+        entries = []
+        batch_bytes = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                offset += len(raw)
+
+                try:
+                    entry = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+
+                # Entries written before analysis_id existed get a stable id from their
+                # content and are merged on their natural key (see LEGACY_MERGE_STATEMENT)
+                legacy = "analysis_id" not in entry
+                analysis_id = entry.get("analysis_id") or str(
+                    uuid.uuid5(uuid.NAMESPACE_URL, raw.decode("utf-8", "replace"))
+                )
+
+                entries.append({"analysis_id": analysis_id, "legacy": legacy, "entry": entry})
+                batch_bytes += len(raw)
+                if len(entries) >= self.batch_size or batch_bytes >= self.max_batch_bytes:
+                    yield offset, entries
+                    entries = []
+                    batch_bytes = 0
+
+        if entries:
+            yield offset, entries
+
+    def sync(self, max_retries=5, dry_run=False):
+        """
+        Ship everything after the watermark. Returns the number of rows sent.
+
+        Safe to run repeatedly and from a cron job; an interrupted run resumes
+        from the last committed batch.
+        """
+        if not self.logger.snowflake_available and not dry_run:
+            raise ValueError("Snowflake credentials not set in .env file")
+
+        state = self._read_state()
+        total = state.get("rows_synced", 0)
+        sent = 0
+
+        if self._replaced(state):
+            # Ship what was left at the end of the old log before starting on the new one
+            sent += self._sync_previous(state, max_retries, dry_run)
+            if not dry_run:
+                # Move the watermark to the start of the new log so the old one is not re-read
+                self.save_watermark(0, total + sent)
+        offset = self.load_watermark()
+
+        for end_offset, entries in self.pending_batches(offset):
+            if not dry_run:
+                self._with_retries(lambda: self._merge_batch(entries), max_retries)
+                self.save_watermark(end_offset, total + sent + len(entries))
+            sent += len(entries)
+            print(f"Synced {sent} log entries (offset {end_offset})")
+
+        return sent
+
+    def _sync_previous(self, state, max_retries, dry_run):
+        offset = state.get("offset", 0)
+        previous = self.previous_log(state)
+        if previous is None:
+            print(
+                f"Warning: {self.logs_file} was cleared or replaced; entries written after "
+                f"byte {offset} of the previous log before it was removed were never synced"
+            )
+            return 0
+
+        sent = 0
+        for end_offset, entries in self.pending_batches(offset, path=previous):
+            if not dry_run:
+                self._with_retries(lambda: self._merge_batch(entries), max_retries)
+            sent += len(entries)
+            print(f"Synced {sent} log entries from rotated log {previous} (offset {end_offset})")
+        return sent
+
+    def _with_retries(self, fn, max_retries):
+        for attempt in range(max_retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = min(2 ** attempt, 60)
+                print(f"Warning: Batch sync failed ({str(e)}), retrying in {delay}s")
+                time.sleep(delay)
+
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.logger.pat_token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+
+    def _merge_batch(self, entries):
+        """Merge one batch: current entries on analysis_id, legacy ones on their natural key"""
+        current = [item for item in entries if not item["legacy"]]
+        legacy = [item for item in entries if item["legacy"]]
+        if current:
+            self._run_statement(MERGE_STATEMENT, current)
+        if legacy:
+            self._run_statement(LEGACY_MERGE_STATEMENT, legacy)
+
+    def _run_statement(self, statement, items):
+        """Submit a statement bound to items as an async statement and wait for it to finish"""
+        url = f"{self.logger.base_url}/api/v2/statements"
+        payload = {
+            "statement": statement,
+            "timeout_in_seconds": 3600,
+            "bindings": {
+                "1": {"type": "TEXT", "value": json.dumps(items)}
+            }
+        }
+
+        response = requests.post(
+            url, headers=self._headers(), json=payload, params={"async": "true"}, timeout=60
+        )
+        if response.status_code not in (200, 202):
+            raise Exception(f"{response.status_code} submitting batch: {response.text}")
+
+        handle = response.json().get("statementHandle")
+        if response.status_code == 200 or not handle:
+            return response.json()
+        return self._poll(handle)
+
+    def _poll(self, handle, poll_interval=2, timeout=3600):
+        """Wait for an async statement; the SQL API answers 202 while it runs"""
+        url = f"{self.logger.base_url}/api/v2/statements/{handle}"
+        deadline = time.time() + timeout
+
+        while time.time() < deadline:
+            response = requests.get(url, headers=self._headers(), timeout=30)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 202:
+                raise Exception(f"{response.status_code} for statement {handle}: {response.text}")
+            time.sleep(poll_interval)
+
+        raise Exception(f"Statement {handle} did not finish within {timeout}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk sync local analysis logs to Snowflake")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Log entries per MERGE statement")
+    parser.add_argument("--dry-run", action="store_true", help="Count unsynced entries without sending them")
+    args = parser.parse_args()
+
+    engine = LogSyncEngine(batch_size=args.batch_size)
+    total = engine.sync(dry_run=args.dry_run)
+    print(f"Done: {total} entries {'pending' if args.dry_run else 'synced'}")
@@ -1,6 +1,7 @@
 import os
 import json
 import time
+import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 import requests
@@ -37,6 +38,7 @@ class AnalysisLogger:
         timestamp = datetime.utcnow().isoformat()
         
         log_entry = {
+            "analysis_id": str(uuid.uuid4()),
             "timestamp": timestamp,
             "category": category,
             "message": message,
@@ -52,7 +54,8 @@ class AnalysisLogger:
             try:
                 self._log_to_snowflake(log_entry)
             except Exception as e:
-                print(f"Warning: Could not log to Snowflake: {str(e)}")
+                # The entry is still in the local file; LogSyncEngine ships it later
+                print(f"Warning: Could not log to Snowflake, left for log sync: {str(e)}")
     
     def _log_to_file(self, log_entry):
         """Store log entry in local JSONL file"""
@@ -72,22 +75,23 @@ class AnalysisLogger:
             "Accept": "application/json"
         }
         
-        # Insert into CONTENT_ANALYSIS table
-        insert_query = f"""
+        # Insert into CONTENT_ANALYSIS table. Entries can carry user-submitted
+        # content, so every value is passed as a binding, never pasted into the SQL.
+        insert_query = """
         INSERT INTO TRUTHGUARD_DB.VERIFICATION_ENGINE.CONTENT_ANALYSIS 
         (analysis_id, content_type, submission_time, verification_status, analysis_details)
-        VALUES (
-            UUID_STRING(),
-            '{log_entry['category']}',
-            CURRENT_TIMESTAMP(),
-            '{log_entry['log_type']}',
-            PARSE_JSON('{json.dumps(log_entry)}')
-        )
+        SELECT ?, ?, CURRENT_TIMESTAMP(), ?, PARSE_JSON(?)
         """
         
         payload = {
             "statement": insert_query,
-            "timeout_in_seconds": 30
+            "timeout_in_seconds": 30,
+            "bindings": {
+                "1": {"type": "TEXT", "value": log_entry["analysis_id"]},
+                "2": {"type": "TEXT", "value": str(log_entry["category"])},
+                "3": {"type": "TEXT", "value": str(log_entry["log_type"])},
+                "4": {"type": "TEXT", "value": json.dumps(log_entry)}
+            }
         }
         
         try:
@@ -0,0 +1,320 @@
+import os
+import json
+import sqlite3
+import argparse
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from src.utils.helpers import SCORE_PATTERN, NEGATED_PATTERN, CREDIBLE_PATTERN, MISINFORMATION_PATTERN
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class ResultsReport:
+    """
+    Aggregate analytics over a batch of verification results.
+
+    Results are flattened into two columnar frames: one row per job
+    (category, verdict, timings) and one row per job and model (score,
+    error, latency). Every aggregate is computed with grouped pandas or
+    NumPy operations over those columns, so a report over hundreds of
+    thousands of results does not loop in Python.
+    """
+
+    def __init__(self, jobs, responses, disagreement_threshold=40):
+        self.jobs = jobs
+        self.responses = responses
+        self.disagreement_threshold = disagreement_threshold
+
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        """
+        Build a report from dicts with "job_id", "category" and "result"
+        (the dict returned by VerificationEngine.verify), plus optional
+        created_at / started_at / finished_at timestamps.
+        """
+        jobs = pd.DataFrame.from_records([
+            {
+                "job_id": record["job_id"],
+                "category": record.get("category"),
+                "created_at": record.get("created_at"),
+                "started_at": record.get("started_at"),
+                "finished_at": record.get("finished_at"),
+                "consensus": (record.get("result") or {}).get("consensus_analysis"),
+                "triage_action": ((record.get("result") or {}).get("triage") or {}).get("action"),
+            }
+            for record in records
+        ], columns=["job_id", "category", "created_at", "started_at", "finished_at", "consensus", "triage_action"])
+
+        responses = pd.DataFrame.from_records([
+            (
+                record["job_id"],
+                record.get("category"),
+                model,
+                response,
+                (record["result"].get("latency_ms") or {}).get(model),
+                (record["result"].get("queue_wait_ms") or {}).get(model),
+            )
+            for record in records if record.get("result")
+            for model, response in record["result"].get("individual_responses", {}).items()
+        ], columns=["job_id", "category", "model", "response", "latency_ms", "queue_wait_ms"])
+
+        return cls(cls._prepare_jobs(jobs), cls._prepare_responses(responses), **kwargs)
+
+    @classmethod
+    def from_job_queue(cls, db_path="jobs/jobs.db", since=None, **kwargs):
+        """Build a report from completed jobs in the local job queue"""
+        query = (
+            "SELECT job_id, category, created_at, started_at, updated_at AS finished_at, result "
+            "FROM jobs WHERE status = 'done'"
+        )
+        params = ()
+        if since is not None:
+            query += " AND created_at >= ?"
+            params = (since,)
+
+        conn = sqlite3.connect(db_path)
+        try:
+            frame = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+        frame["result"] = [json.loads(result) if result else None for result in frame["result"]]
+        return cls.from_records(frame.to_dict("records"), **kwargs)
+
+    @staticmethod
+    def _prepare_jobs(jobs):
+        consensus = jobs["consensus"].fillna("").str.lower()
+        # Vectorized helpers.verdict_label: negated keywords count against the content
+        negated = consensus.str.contains(NEGATED_PATTERN)
+        credible = consensus.str.replace(NEGATED_PATTERN, " ", regex=True).str.contains(CREDIBLE_PATTERN)
+        misinformation = negated | consensus.str.contains(MISINFORMATION_PATTERN)
+        jobs["verdict"] = np.select(
+            [credible & ~misinformation, misinformation & ~credible],
+            ["credible", "misinformation"],
+            default="unclear"
+        )
+        jobs["queue_wait_s"] = jobs["started_at"] - jobs["created_at"]
+        jobs["total_s"] = jobs["finished_at"] - jobs["created_at"]
+        jobs["category"] = jobs["category"].astype("category")
+        return jobs
+
+    @staticmethod
+    def _prepare_responses(responses):
+        text = responses["response"].fillna("")
+        responses["error"] = text.str.startswith("Error")
+        scores = text.str.extract(SCORE_PATTERN, expand=False).astype("float64")
+        responses["score"] = scores.where((scores >= 0) & (scores <= 100))
+        responses["latency_ms"] = responses["latency_ms"].astype("float64")
+        responses["queue_wait_ms"] = responses["queue_wait_ms"].astype("float64")
+        responses["category"] = responses["category"].astype("category")
+        responses["model"] = responses["model"].astype("category")
+        return responses.drop(columns=["response"])
+
+    def score_matrix(self):
+        """Jobs x models table of credibility scores (NaN where missing)"""
+        return self.responses.pivot_table(index="job_id", columns="model", values="score", observed=True)
+
+    def agreement_matrix(self):
+        """
+        Pairwise model agreement: share of jobs scored by both models where
+        they land on the same side of 50, and mean absolute score gap.
+        """
+        matrix = self.score_matrix()
+        scores = matrix.to_numpy()
+        valid = ~np.isnan(scores)
+        high = (scores >= 50) & valid
+        low = (scores < 50) & valid
+
+        valid_f, high_f, low_f = valid.astype(float), high.astype(float), low.astype(float)
+        both = valid_f.T @ valid_f
+        agree = high_f.T @ high_f + low_f.T @ low_f
+        filled = np.where(valid, scores, 0.0)
+        # One broadcast over all jobs per model: summed |a - b| against every other model
+        gap = np.array([
+            (np.abs(filled[:, [i]] - filled) * (valid[:, [i]] & valid)).sum(axis=0)
+            for i in range(scores.shape[1])
+        ]).reshape(scores.shape[1], scores.shape[1])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            agreement = pd.DataFrame(agree / both, index=matrix.columns, columns=matrix.columns)
+            mean_gap = pd.DataFrame(gap / both, index=matrix.columns, columns=matrix.columns)
+        overlap = pd.DataFrame(both, index=matrix.columns, columns=matrix.columns).astype(int)
+        return {"agreement": agreement, "mean_score_gap": mean_gap, "overlap": overlap}
+
+    def score_distribution(self, bins=10):
+        """Score summary statistics and histogram counts per category"""
+        scored = self.responses.dropna(subset=["score"])
+        stats = scored.groupby("category", observed=True)["score"].describe()
+        edges = np.linspace(0, 100, bins + 1)
+        histogram = (
+            pd.crosstab(scored["category"], pd.cut(scored["score"], edges, include_lowest=True))
+            if len(scored) else pd.DataFrame()
+        )
+        return {"summary": stats, "histogram": histogram}
+
+    def disagreement(self, top=20):
+        """Per-job score spread across models, aggregated into hotspots"""
+        matrix = self.score_matrix()
+        spread = pd.Series(
+            np.nanmax(matrix.to_numpy(), axis=1) - np.nanmin(matrix.to_numpy(), axis=1)
+            if matrix.size else np.zeros(0),
+            index=matrix.index,
+            name="spread"
+        )
+        scored_models = matrix.notna().sum(axis=1)
+        spread = spread[scored_models >= 2]
+
+        per_job = self.jobs.set_index("job_id")[["category", "verdict"]].join(spread, how="inner")
+        per_job["disagrees"] = per_job["spread"] >= self.disagreement_threshold
+        hotspots = (
+            per_job.groupby("category", observed=True)
+            .agg(jobs=("spread", "size"), mean_spread=("spread", "mean"), disagreement_rate=("disagrees", "mean"))
+            .sort_values("disagreement_rate", ascending=False)
+        )
+        return {"hotspots": hotspots, "top_jobs": per_job.nlargest(top, "spread")}
+
+    def latency_percentiles(self):
+        """Model call latency, scheduler wait and end-to-end job time percentiles (ms)"""
+        per_model = (
+            self.responses.groupby("model", observed=True)[["latency_ms", "queue_wait_ms"]]
+            .quantile(list(PERCENTILES))
+            .unstack()
+        )
+        per_model.columns = [f"{column}_p{int(q * 100)}" for column, q in per_model.columns]
+
+        end_to_end = (self.jobs[["queue_wait_s", "total_s"]] * 1000).quantile(list(PERCENTILES))
+        end_to_end.index = [f"p{int(q * 100)}" for q in end_to_end.index]
+        end_to_end.columns = ["queue_wait_ms", "total_ms"]
+        return {"per_model": per_model, "end_to_end": end_to_end}
+
+    def summary(self):
+        """Every aggregate as JSON-ready nested dicts"""
+        agreement = self.agreement_matrix()
+        distribution = self.score_distribution()
+        disagreement = self.disagreement()
+        latency = self.latency_percentiles()
+
+        def table(frame):
+            frame = frame.copy()
+            frame.columns = [str(column) for column in frame.columns]
+            frame.index = [str(index) for index in frame.index]
+            return json.loads(frame.to_json(orient="index"))
+
+        return {
+            "jobs": int(len(self.jobs)),
+            "model_responses": int(len(self.responses)),
+            "error_rate": float(self.responses["error"].mean()) if len(self.responses) else None,
+            "verdicts": {str(k): int(v) for k, v in self.jobs["verdict"].value_counts().items()},
+            "triage_actions": {str(k): int(v) for k, v in self.jobs["triage_action"].value_counts().items()},
+            "agreement": {name: table(frame) for name, frame in agreement.items()},
+            "score_distribution": {name: table(frame) for name, frame in distribution.items()},
+            "disagreement_hotspots": table(disagreement["hotspots"]),
+            "top_disagreements": table(disagreement["top_jobs"]),
+            "latency": {name: table(frame) for name, frame in latency.items()},
+        }
+
+    def charts(self):
+        """Plotly figures for the HTML report"""
+        agreement = self.agreement_matrix()["agreement"]
+        figures = [
+            go.Figure(
+                go.Heatmap(
+                    z=agreement.to_numpy(),
+                    x=[str(c) for c in agreement.columns],
+                    y=[str(i) for i in agreement.index],
+                    zmin=0, zmax=1, colorscale="Teal"
+                ),
+                layout={"title": "Model agreement (same side of 50)"}
+            )
+        ]
+
+        scored = self.responses.dropna(subset=["score"])
+        if len(scored):
+            figures.append(px.box(scored, x="category", y="score", color="model",
+                                  title="Credibility scores by category"))
+
+        hotspots = self.disagreement()["hotspots"].reset_index()
+        if len(hotspots):
+            figures.append(px.bar(hotspots, x="category", y="disagreement_rate",
+                                  title=f"Share of jobs with score spread >= {self.disagreement_threshold}"))
+
+        latency = self.responses.dropna(subset=["latency_ms"])
+        if len(latency):
+            figures.append(px.histogram(latency, x="latency_ms", color="model", nbins=50,
+                                        barmode="overlay", title="Model latency (ms)"))
+        return figures
+
+    def to_json(self, path=None):
+        report = json.dumps(self.summary(), indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(report)
+        return report
+
+    def to_csv(self, directory):
+        """Write each aggregate table as its own CSV file"""
+        os.makedirs(directory, exist_ok=True)
+        tables = {
+            **{f"agreement_{name}": frame for name, frame in self.agreement_matrix().items()},
+            **{f"scores_{name}": frame for name, frame in self.score_distribution().items()},
+            **{f"disagreement_{name}": frame for name, frame in self.disagreement().items()},
+            **{f"latency_{name}": frame for name, frame in self.latency_percentiles().items()},
+        }
+        paths = []
+        for name, frame in tables.items():
+            path = os.path.join(directory, f"{name}.csv")
+            frame.to_csv(path)
+            paths.append(path)
+        return paths
+
+    def to_html(self, path=None):
+        summary = self.summary()
+        agreement = self.agreement_matrix()
+        distribution = self.score_distribution()
+        disagreement = self.disagreement()
+        latency = self.latency_percentiles()
+
+        error_rate = summary["error_rate"]
+        sections = [
+            "<h1>TruthGuard batch report</h1>"
+            f"<p>{summary['jobs']} jobs, {summary['model_responses']} model responses, "
+            f"error rate {round(error_rate, 4) if error_rate is not None else 'n/a'}</p>"
+        ]
+        for i, figure in enumerate(self.charts()):
+            sections.append(figure.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+
+        tables = [
+            ("Agreement", agreement["agreement"]),
+            ("Mean score gap", agreement["mean_score_gap"]),
+            ("Score summary", distribution["summary"]),
+            ("Disagreement hotspots", disagreement["hotspots"]),
+            ("Largest disagreements", disagreement["top_jobs"]),
+            ("Latency per model", latency["per_model"]),
+            ("End-to-end latency", latency["end_to_end"]),
+        ]
+        for title, frame in tables:
+            sections.append(f"<h2>{title}</h2>{frame.round(3).to_html()}")
+
+        html = "<html><head><meta charset='utf-8'></head><body>" + "\n".join(sections) + "</body></html>"
+        if path:
+            with open(path, "w") as f:
+                f.write(html)
+        return html
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch analytics over verification results")
+    parser.add_argument("--db", default="jobs/jobs.db", help="Path to the job queue database")
+    parser.add_argument("--out", default="reports", help="Directory for the JSON, CSV and HTML reports")
+    parser.add_argument("--since", type=float, default=None, help="Only jobs created after this Unix time")
+    args = parser.parse_args()
+
+    report = ResultsReport.from_job_queue(args.db, since=args.since)
+    os.makedirs(args.out, exist_ok=True)
+    report.to_json(os.path.join(args.out, "report.json"))
+    report.to_csv(os.path.join(args.out, "csv"))
+    report.to_html(os.path.join(args.out, "report.html"))
+    print(f"Report over {len(report.jobs)} jobs written to {args.out}")
@@ -0,0 +1,265 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import closing
+
+
+class SharedSlots:
+    """
+    Concurrency slots and rate limits shared by every process that opens
+    the same SQLite file (by default the job queue's database).
+
+    A slot is a lease row. The process holding it renews it in the
+    background, so a process that dies gives its slots back after
+    lease_seconds. Callers can also queue for slots as waiter rows, which
+    puts waiters from every process in one global order: lowest rank
+    first, then the tenant holding the fewest slots for its weight, then
+    the oldest.
+    """
+
+    def __init__(self, db_path="jobs/jobs.db", lease_seconds=60, waiter_timeout=10):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.waiter_timeout = waiter_timeout
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS slot_leases (
+                    lease_id TEXT PRIMARY KEY,
+                    resource TEXT NOT NULL,
+                    tenant TEXT,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS slot_leases_resource ON slot_leases (resource, tenant)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS slot_waiters (
+                    ticket_id TEXT PRIMARY KEY,
+                    resource TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    tenant TEXT NOT NULL,
+                    weight REAL NOT NULL,
+                    queued_at REAL NOT NULL,
+                    seen_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS slot_waiters_resource ON slot_waiters (resource, rank, queued_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    resource TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    refilled_at REAL NOT NULL
+                )
+            """)
+
+        self._lock = threading.Lock()
+        self._leases = set()
+        self._tickets = set()
+        self._renewer = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # Leases are rebuilt within seconds after a crash; no need to fsync every change
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return closing(conn)
+
+    def acquire(self, resource, limit, tenant=None, rate_per_minute=0):
+        """
+        Take a slot right away if fewer than limit are held and, with a rate
+        limit, a token is left in the resource's bucket. Returns a lease id,
+        or None if the caller has to try again later.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM slot_leases WHERE resource = ? AND expires_at <= ?", (resource, now))
+                lease_id = None
+                if self._held(conn, resource, now) < limit and self._take_token(conn, resource, rate_per_minute, now):
+                    lease_id = uuid.uuid4().hex
+                    self._insert_lease(conn, lease_id, resource, tenant, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if lease_id:
+            self._track(self._leases, lease_id)
+        return lease_id
+
+    def enqueue(self, resource, rank, tenant, weight=1.0):
+        """Join the global line for a resource; returns a ticket for admit()"""
+        ticket_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO slot_waiters (ticket_id, resource, rank, tenant, weight, queued_at, seen_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (ticket_id, resource, rank, tenant, weight, now, now)
+            )
+        self._track(self._tickets, ticket_id)
+        return ticket_id
+
+    def admit(self, ticket_id, resource, limit, reserved=0):
+        """
+        Turn a ticket into a lease (with the same id) if it is first in line
+        and a slot is free. Only rank 0 may take the last `reserved` slots.
+        Returns True once admitted.
+        """
+        now = time.time()
+        # Read first, so waiters that are not next in line never take the write lock
+        with self._connect() as conn:
+            if not self._admissible(conn, ticket_id, resource, limit, reserved, now):
+                return False
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM slot_leases WHERE resource = ? AND expires_at <= ?", (resource, now))
+                conn.execute(
+                    "DELETE FROM slot_waiters WHERE resource = ? AND seen_at <= ?",
+                    (resource, now - self.waiter_timeout)
+                )
+                admitted = self._admissible(conn, ticket_id, resource, limit, reserved, now)
+                if admitted:
+                    tenant = conn.execute(
+                        "SELECT tenant FROM slot_waiters WHERE ticket_id = ?", (ticket_id,)
+                    ).fetchone()["tenant"]
+                    conn.execute("DELETE FROM slot_waiters WHERE ticket_id = ?", (ticket_id,))
+                    self._insert_lease(conn, ticket_id, resource, tenant, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if admitted:
+            with self._lock:
+                self._tickets.discard(ticket_id)
+                self._leases.add(ticket_id)
+        return admitted
+
+    def withdraw(self, ticket_id):
+        """Leave the line without taking a slot"""
+        with self._lock:
+            self._tickets.discard(ticket_id)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM slot_waiters WHERE ticket_id = ?", (ticket_id,))
+
+    def release(self, lease_id):
+        """Give a slot back"""
+        with self._lock:
+            self._leases.discard(lease_id)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM slot_leases WHERE lease_id = ?", (lease_id,))
+
+    def in_use(self):
+        """Live slots per resource, across all processes"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT resource, COUNT(*) AS n FROM slot_leases WHERE expires_at > ? GROUP BY resource",
+                (time.time(),)
+            ).fetchall()
+        return {row["resource"]: row["n"] for row in rows}
+
+    def queued(self):
+        """Waiters per resource and rank, across all processes"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT resource, rank, COUNT(*) AS n FROM slot_waiters
+                WHERE seen_at > ? GROUP BY resource, rank
+                """,
+                (time.time() - self.waiter_timeout,)
+            ).fetchall()
+        queued = {}
+        for row in rows:
+            queued.setdefault(row["resource"], {})[row["rank"]] = row["n"]
+        return queued
+
+    def _held(self, conn, resource, now):
+        return conn.execute(
+            "SELECT COUNT(*) FROM slot_leases WHERE resource = ? AND expires_at > ?", (resource, now)
+        ).fetchone()[0]
+
+    def _admissible(self, conn, ticket_id, resource, limit, reserved, now):
+        head = conn.execute(
+            """
+            SELECT ticket_id, rank FROM slot_waiters AS w
+            WHERE resource = ? AND seen_at > ?
+            ORDER BY
+                rank,
+                (SELECT COUNT(*) FROM slot_leases AS l
+                 WHERE l.resource = w.resource AND l.tenant = w.tenant AND l.expires_at > ?) / w.weight,
+                queued_at
+            LIMIT 1
+            """,
+            (resource, now - self.waiter_timeout, now)
+        ).fetchone()
+        if head is None or head["ticket_id"] != ticket_id:
+            return False
+        return self._held(conn, resource, now) < limit - (0 if head["rank"] == 0 else reserved)
+
+    def _take_token(self, conn, resource, rate_per_minute, now):
+        # Token bucket holding up to one minute of requests
+        if not rate_per_minute:
+            return True
+        row = conn.execute(
+            "SELECT tokens, refilled_at FROM rate_buckets WHERE resource = ?", (resource,)
+        ).fetchone()
+        tokens = float(rate_per_minute)
+        if row is not None:
+            tokens = min(tokens, row["tokens"] + (now - row["refilled_at"]) * rate_per_minute / 60.0)
+
+        taken = tokens >= 1
+        conn.execute(
+            "INSERT OR REPLACE INTO rate_buckets (resource, tokens, refilled_at) VALUES (?, ?, ?)",
+            (resource, tokens - 1 if taken else tokens, now)
+        )
+        return taken
+
+    def _insert_lease(self, conn, lease_id, resource, tenant, now):
+        conn.execute(
+            "INSERT INTO slot_leases (lease_id, resource, tenant, expires_at) VALUES (?, ?, ?, ?)",
+            (lease_id, resource, tenant, now + self.lease_seconds)
+        )
+
+    def _track(self, ids, item):
+        with self._lock:
+            ids.add(item)
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew, daemon=True)
+                self._renewer.start()
+
+    def _renew(self):
+        """Keep this process's leases and waiters alive for as long as it runs"""
+        interval = min(self.lease_seconds, self.waiter_timeout) / 3
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                leases = list(self._leases)
+                tickets = list(self._tickets)
+            if not leases and not tickets:
+                continue
+
+            now = time.time()
+            try:
+                with self._connect() as conn:
+                    for lease_id in leases:
+                        conn.execute(
+                            "UPDATE slot_leases SET expires_at = ? WHERE lease_id = ?",
+                            (now + self.lease_seconds, lease_id)
+                        )
+                    for ticket_id in tickets:
+                        conn.execute("UPDATE slot_waiters SET seen_at = ? WHERE ticket_id = ?", (now, ticket_id))
+            except Exception as e:
+                print(f"Warning: Could not renew shared slots: {str(e)}")
@@ -1,11 +1,13 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
+import os
 import time
 import json
 
 from src.ui.theme import apply_theme
-from src.ui.components import metric_card, alert_box
-from src.models.verification_engine import VerificationEngine
+from src.ui.components import metric_card, alert_box, LiveLog, log_panel
+from src.models.job_worker import WorkerPool
+from src.utils.job_queue import JobQueue
 from src.utils.logger import AnalysisLogger
 
 # Page configuration
@@ -18,11 +20,38 @@ st.set_page_config(
 
 apply_theme()
 
+
+# Time budget for an interactive analysis before it is stopped with partial results
+UI_DEADLINE_SECONDS = float(os.getenv("TRUTHGUARD_UI_DEADLINE", "180"))
+# Time a worker gets past the deadline to store the partial result
+DEADLINE_GRACE_SECONDS = 10
+
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+
+@st.cache_resource
+def get_worker_pool():
+    # Set TRUTHGUARD_WORKERS=0 to run workers separately (python -m src.models.job_worker)
+    num_workers = int(os.getenv("TRUTHGUARD_WORKERS", "2"))
+    if num_workers <= 0:
+        return None
+    return WorkerPool(num_workers=num_workers).start()
+
+
+get_worker_pool()
+
 # Initialize session state
 if 'results' not in st.session_state:
     st.session_state.results = None
 if 'last_content' not in st.session_state:
     st.session_state.last_content = ""
+if 'analysis_log' not in st.session_state:
+    st.session_state.analysis_log = []
+if 'analysis_error' not in st.session_state:
+    st.session_state.analysis_error = None
 
 # Sidebar
 with st.sidebar:
@@ -56,8 +85,14 @@ with st.sidebar:
     
     st.markdown("---")
     if st.button("🔄 Reset Analysis", width='stretch'):
+        # Stop the running job so it does not keep holding Cortex capacity
+        if st.query_params.get("job"):
+            get_job_queue().cancel(st.query_params["job"], "Analysis reset by user")
         st.session_state.results = None
         st.session_state.last_content = ""
+        st.session_state.analysis_log = []
+        st.session_state.analysis_error = None
+        st.query_params.pop("job", None)
         st.rerun()
 
 # Main content area
@@ -74,108 +109,172 @@ with col2:
 
 st.markdown("---")
 
-# Two-column layout for input and preview
-col1, col2 = st.columns([2, 1])
-
-with col1:
-    st.markdown("### 📝 Enter Content to Analyze")
-    content = st.text_area(
-        f"Paste {selected.lower()} content here:",
-        height=250,
-        placeholder="Enter the content you want to verify for misinformation...",
-        key="content_input"
-    )
-
-with col2:
+# Settings, analysis log and results are fragments: interacting with a widget
+# inside one only re-runs that function, not the theme and the whole page.
+@st.fragment
+def settings_panel():
     st.markdown("### 📊 Analysis Settings")
     
     # Model selection
-    use_all_models = st.checkbox("Use all models", value=True, help="Compare results across multiple models")
+    st.checkbox("Use all models", value=True, key="use_all_models", help="Compare results across multiple models")
     
-    temperature = st.slider(
+    st.slider(
         "Temperature (creativity)",
         min_value=0.0,
         max_value=1.0,
         value=0.0,
         step=0.1,
+        key="temperature",
         help="Lower = more deterministic, Higher = more creative"
     )
     
-    max_tokens = st.slider(
+    st.slider(
         "Max tokens",
         min_value=256,
         max_value=2048,
         value=512,
         step=256,
+        key="max_tokens",
         help="Maximum length of response"
     )
 
-st.markdown("---")
 
-# Analyze button with logs
-col1, col2 = st.columns([3, 1])
+def wait_for_job(job_id, log, poll_interval=0.5):
+    """
+    Poll a queued job until it finishes, logging each status change.
 
-with col1:
-    if st.button("🔍 Analyze Content", width='stretch', key="analyze_btn"):
-        if content.strip():
-            st.session_state.last_content = content
-            
-            # Create a container for real-time logs
-            log_container = st.container()
-            
-            with log_container:
-                st.markdown("### 📋 Real-time Analysis Log")
-                log_placeholder = st.empty()
-                logs = []
-                
-                def add_log(message, log_type="info"):
-                    timestamp = time.strftime("%H:%M:%S")
-                    log_entry = f"[{timestamp}] {message}"
-                    logs.append(log_entry)
-                    
-                    # Display formatted logs
-                    if log_type == "success":
-                        icon = "✅"
-                    elif log_type == "error":
-                        icon = "❌"
-                    elif log_type == "warning":
-                        icon = "⚠️"
-                    else:
-                        icon = "ℹ️"
-                    
-                    log_display = "\n".join([f"{icon} {log}" for log in logs])
-                    log_placeholder.markdown(f"```\n{log_display}\n```")
-                
-                try:
-                    add_log("Initializing verification engine...", "info")
-                    engine = VerificationEngine()
-                    
-                    add_log(f"Starting analysis for category: {selected.lower()}", "info")
-                    add_log(f"Content length: {len(content)} characters", "info")
-                    
-                    with st.spinner(f"🔄 Analyzing {selected} content with Snowflake Cortex AI..."):
-                        results = engine.verify(selected.lower(), content)
-                    
-                    add_log("Analysis complete!", "success")
-                    add_log(f"Models queried: {len(results.get('individual_responses', {}))}", "success")
-                    
-                    st.session_state.results = results
-                    
-                except Exception as e:
-                    add_log(f"Analysis failed: {str(e)}", "error")
-                    alert_box(f"❌ Analysis failed: {str(e)}", alert_type="error")
-                    st.session_state.results = None
+    Each poll tells the queue this session is still watching; if the page
+    is closed the polls stop and the worker abandons the job. Gives up once
+    the job's deadline has passed or when the app's worker processes have
+    all exited.
+    """
+    queue = get_job_queue()
+    pool = get_worker_pool()
+    last_state = None
+    status_line = st.empty()
+    started = time.time()
+    
+    while True:
+        queue.touch(job_id)
+        job = queue.status(job_id)
+        if job is None:
+            raise Exception(f"Unknown job: {job_id}")
+        
+        state = (job["status"], job["attempts"])
+        if state != last_state:
+            if job["status"] == "queued" and job["attempts"]:
+                log.add(f"Attempt {job['attempts']} failed, retrying: {job['error']}", "warning")
+            elif job["status"] == "queued":
+                log.add("Job queued, waiting for a worker...", "info")
+            elif job["status"] == "running":
+                log.add(f"Worker running analysis (attempt {job['attempts']}/{job['max_attempts']})", "info")
+            last_state = state
+        
+        if job["status"] == "done":
+            status_line.empty()
+            return queue.get(job_id)["result"]
+        if job["status"] == "failed":
+            raise Exception(job["error"] or "Job failed")
+        if job["status"] == "cancelled":
+            status_line.empty()
+            result = queue.get(job_id)["result"]
+            if not result:
+                raise Exception(job["error"] or "Job cancelled")
+            return result
+        
+        if job["deadline"] is not None and time.time() > job["deadline"] + DEADLINE_GRACE_SECONDS:
+            # A running job is stopped by its worker at the deadline; this only
+            # triggers when no worker is there to do it
+            queue.cancel(job_id, "Deadline exceeded")
+            raise Exception("Deadline exceeded before a worker finished the job")
+        if pool is not None and pool.alive() == 0:
+            queue.cancel(job_id, "No verification workers are running")
+            raise Exception("No verification workers are running; check the worker logs for a configuration error")
+        
+        # Rendering on every poll also lets Streamlit interrupt the loop (e.g. on Reset)
+        status_line.caption(f"⏱️ {time.time() - started:.0f}s elapsed")
+        time.sleep(poll_interval)
+
+
+def follow_job(job_id, selected, content=None):
+    """Show the live log for a job and store its results when it finishes"""
+    st.markdown("### 📋 Real-time Analysis Log")
+    log = LiveLog(st.container(), lines=[])
+    
+    try:
+        if content is not None:
+            log.add(f"Starting analysis for category: {selected.lower()}", "info")
+            log.add(f"Content length: {len(content)} characters", "info")
+        log.add(f"Tracking job {job_id}", "info")
+        
+        with st.spinner(f"🔄 Analyzing {selected} content with Snowflake Cortex AI..."):
+            results = wait_for_job(job_id, log)
+        
+        if results.get("cancelled"):
+            log.add(f"Analysis stopped early: {results['cancelled']}", "warning")
+            log.add(f"Partial responses: {len(results.get('individual_responses', {}))}", "warning")
         else:
-            alert_box("⚠️ Please paste content for analysis before clicking Analyze.", alert_type="warning")
+            log.add("Analysis complete!", "success")
+            log.add(f"Models queried: {len(results.get('individual_responses', {}))}", "success")
+        
+        st.session_state.results = results
+        st.session_state.analysis_error = None
+        
+    except Exception as e:
+        log.add(f"Analysis failed: {str(e)}", "error")
+        st.session_state.results = None
+        st.session_state.analysis_error = str(e)
+    
+    st.session_state.analysis_log = log.lines
+    st.query_params.pop("job", None)
+    # Results live in their own fragment; redraw the page once so it shows the
+    # new results, or clears the previous ones after a failure
+    st.rerun()
 
-with col2:
-    st.markdown("###")
-    if st.button("📥 View Logs", width='content'):
-        st.info("Logs shown in real-time above during analysis")
 
-# Display results if available
-if st.session_state.results:
+@st.fragment
+def analysis_panel(selected):
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        pending_job = st.query_params.get("job")
+        
+        if st.button("🔍 Analyze Content", width='stretch', key="analyze_btn"):
+            content = st.session_state.get("content_input", "")
+            if content.strip():
+                st.session_state.last_content = content
+                
+                # The job id lives in the URL so a browser refresh picks the job back up
+                job_id = get_job_queue().submit(
+                    selected.lower(),
+                    content,
+                    priority="interactive",
+                    deadline=UI_DEADLINE_SECONDS,
+                    watched=True
+                )
+                st.query_params["job"] = job_id
+                follow_job(job_id, selected, content)
+            else:
+                alert_box("⚠️ Please paste content for analysis before clicking Analyze.", alert_type="warning")
+        elif pending_job:
+            follow_job(pending_job, selected)
+        elif st.session_state.analysis_log:
+            st.markdown("### 📋 Real-time Analysis Log")
+            log_panel(st.session_state.analysis_log)
+            if st.session_state.analysis_error:
+                alert_box(f"❌ Analysis failed: {st.session_state.analysis_error}", alert_type="error")
+    
+    with col2:
+        st.markdown("###")
+        if st.button("📥 View Logs", width='content'):
+            st.info("Logs shown in real-time above during analysis")
+
+
+@st.fragment
+def results_panel(selected):
     results = st.session_state.results
+    if not results:
+        return
     
     st.markdown("---")
     st.markdown("## 📊 Analysis Results")
@@ -200,7 +299,10 @@ if st.session_state.results:
     
     individual = results.get("individual_responses", {})
     
-    cols = st.columns(len(individual))
+    if not individual:
+        st.info("Cortex models were skipped: the local triage model was confident enough on its own.")
+    
+    cols = st.columns(len(individual)) if individual else []
     
     for idx, (model, response) in enumerate(individual.items()):
         with cols[idx]:
@@ -234,7 +336,10 @@ if st.session_state.results:
         metric_card("Successful", str(len(individual) - error_count), color="#4ECDC4")
     
     with col4:
-        metric_card("Status", "✅ Complete", color="#95E1D3")
+        if results.get("cancelled"):
+            metric_card("Status", "⚠️ Partial", delta=results["cancelled"], color="#FFD93D")
+        else:
+            metric_card("Status", "✅ Complete", color="#95E1D3")
     
     # Export options
     st.markdown("---")
@@ -242,7 +347,6 @@ if st.session_state.results:
     
     with col1:
         if st.button("📥 Export Results as JSON", width='stretch'):
-            import json
             json_str = json.dumps(results, indent=2)
             st.download_button(
                 label="Download JSON",
@@ -255,4 +359,28 @@ if st.session_state.results:
     with col2:
         if st.button("📋 Copy to Clipboard", width='stretch'):
             st.success("Results formatted for clipboard!")
-            st.code(str(results), language="python")
\ No newline at end of file
+            st.code(str(results), language="python")
+
+
+# Two-column layout for input and preview
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.markdown("### 📝 Enter Content to Analyze")
+    content = st.text_area(
+        f"Paste {selected.lower()} content here:",
+        height=250,
+        placeholder="Enter the content you want to verify for misinformation...",
+        key="content_input"
+    )
+
+with col2:
+    settings_panel()
+
+st.markdown("---")
+
+# Analyze button with logs
+analysis_panel(selected)
+
+# Display results if available
+results_panel(selected)
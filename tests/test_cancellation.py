@@ -0,0 +1,54 @@
+import pytest
+
+from src.utils.cancellation import CancellationToken, CancelledError
+
+
+def test_deadline_cancels_without_polling():
+    token = CancellationToken(timeout=0.05)
+    assert token.remaining() <= 0.05
+
+    # wait() only returns True once the event is set, i.e. the timer fired
+    assert token.wait(2)
+    assert token.reason == "Deadline exceeded"
+    assert token.remaining() == 0.0
+
+
+def test_close_stops_the_deadline_timer():
+    token = CancellationToken(timeout=0.05)
+    token.close()
+
+    assert not token.wait(0.2)
+
+
+def test_on_cancel_runs_callbacks_once():
+    token = CancellationToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("a"))
+    key = token.on_cancel(lambda: calls.append("removed"))
+    token.remove(key)
+
+    token.cancel("Stopped by user")
+    token.cancel("Deadline exceeded")
+    assert calls == ["a"]
+    assert token.reason == "Stopped by user"
+
+
+def test_on_cancel_after_cancel_runs_immediately():
+    token = CancellationToken()
+    token.cancel()
+    calls = []
+
+    assert token.on_cancel(lambda: calls.append("late")) is None
+    assert calls == ["late"]
+
+
+def test_raise_if_cancelled_carries_the_partial_result():
+    token = CancellationToken()
+    token.raise_if_cancelled()
+    assert token.remaining() is None
+
+    token.cancel("Stopped by user")
+    with pytest.raises(CancelledError) as excinfo:
+        token.raise_if_cancelled(partial={"news": "half"})
+    assert excinfo.value.reason == "Stopped by user"
+    assert excinfo.value.partial == {"news": "half"}
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from src.api.cortex_pool import CortexAccount, CortexAccountPool
+from src.api.snowflake_cortex import CortexThrottledError, CortexUnavailableError
+
+
+class StubClient:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def complete(self, model, messages, **kwargs):
+        self.calls += 1
+        result = self.results.pop(0) if self.results else "ok"
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _pool(*clients, **kwargs):
+    accounts = [CortexAccount(name, client) for name, client in zip("ab", clients)]
+    return CortexAccountPool(accounts, **kwargs)
+
+
+@pytest.mark.parametrize("error", [CortexThrottledError("429 Too Many Requests"),
+                                   CortexUnavailableError("503 Service Unavailable")])
+def test_fails_over_to_the_next_account(error):
+    first, second = StubClient(error), StubClient("from b")
+    pool = _pool(first, second)
+
+    assert pool.complete("m", []) == "from b"
+    assert (first.calls, second.calls) == (1, 1)
+    stats = pool.stats()
+    assert stats["a"]["errors"] == 1
+    assert stats["a"]["throttled"] == (1 if isinstance(error, CortexThrottledError) else 0)
+    assert stats["a"]["cooldown_s"] > 0
+
+
+def test_cooling_account_is_skipped_until_its_cooldown_ends():
+    first, second = StubClient(CortexThrottledError("429"), CortexThrottledError("429")), StubClient()
+    pool = _pool(first, second)
+    account = pool.accounts[0]
+
+    pool.complete("m", [])
+    assert account.cooldown_until - time.monotonic() == pytest.approx(2, abs=0.5)
+    pool.complete("m", [])
+    assert first.calls == 1
+
+    # The cooldown grows with each failure in a row
+    account.cooldown_until = 0
+    pool.complete("m", [])
+    assert account.cooldown_until - time.monotonic() == pytest.approx(4, abs=0.5)
+
+    account.cooldown_until = 0
+    pool.complete("m", [])
+    assert first.calls == 3
+    assert account.consecutive_failures == 0
+
+
+def test_raises_the_last_error_when_every_account_fails():
+    pool = _pool(StubClient(CortexThrottledError("429")), StubClient(CortexUnavailableError("502")))
+
+    with pytest.raises((CortexThrottledError, CortexUnavailableError)):
+        pool.complete("m", [])
+
+
+def test_no_account_available():
+    pool = _pool(StubClient(), StubClient(), acquire_timeout=0.1)
+    for account in pool.accounts:
+        account.cooldown_until = time.monotonic() + 60
+
+    with pytest.raises(CortexUnavailableError, match="No Cortex account available"):
+        pool.complete("m", [])
+
+
+@pytest.fixture
+def numbered_env(monkeypatch):
+    for index in (1, 2, 3):
+        for name in ("SNOWFLAKE_ACCOUNT", "PERSONAL_ACCESS_TOKEN", "CORTEX_WEIGHT"):
+            monkeypatch.delenv(f"{name}_{index}", raising=False)
+    monkeypatch.setenv("PERSONAL_ACCESS_TOKEN", "primary")
+    monkeypatch.setenv("SNOWFLAKE_ACCOUNT_1", "acct_a")
+    monkeypatch.setenv("PERSONAL_ACCESS_TOKEN_1", "token_a")
+    monkeypatch.setenv("SNOWFLAKE_ACCOUNT_2", "acct_b")
+    return monkeypatch
+
+
+def test_from_env_requires_a_token_per_account(numbered_env):
+    with pytest.raises(ValueError, match="PERSONAL_ACCESS_TOKEN_2"):
+        CortexAccountPool.from_env()
+
+    numbered_env.setenv("PERSONAL_ACCESS_TOKEN_2", "token_b")
+    pool = CortexAccountPool.from_env()
+    assert [account.client.pat_token for account in pool.accounts] == ["token_a", "token_b"]
+
+
+def test_from_env_rejects_non_positive_weights(numbered_env):
+    numbered_env.setenv("PERSONAL_ACCESS_TOKEN_2", "token_b")
+    numbered_env.setenv("CORTEX_WEIGHT_2", "0")
+
+    with pytest.raises(ValueError, match="CORTEX_WEIGHT_2"):
+        CortexAccountPool.from_env()
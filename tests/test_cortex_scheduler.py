@@ -0,0 +1,130 @@
+import time
+import threading
+
+import pytest
+
+from src.api.cortex_scheduler import CortexScheduler, parse_tenant_weights
+from src.utils.cancellation import CancellationToken, CancelledError
+from src.utils.shared_slots import SharedSlots
+
+
+class FakeClient:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def complete(self, model, messages, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return "ok"
+
+
+@pytest.fixture(params=["local", "shared"])
+def make_scheduler(request, tmp_path):
+    def make(**kwargs):
+        slots = SharedSlots(str(tmp_path / "jobs.db")) if request.param == "shared" else None
+        return CortexScheduler(kwargs.pop("client", FakeClient()), slots=slots, poll_interval=0.01, **kwargs)
+    return make
+
+
+def _queued(scheduler, priority, model="m"):
+    return scheduler.stats().get(model, {}).get("queued", {}).get(priority, 0)
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_budget_caps_concurrent_calls(make_scheduler):
+    client = FakeClient()
+    scheduler = make_scheduler(client=client, default_budget=2, tenant_weights={})
+
+    threads = [_start(scheduler.complete, "m", []) for _ in range(6)]
+    for thread in threads:
+        thread.join(10)
+
+    assert client.max_active == 2
+    assert scheduler.stats()["m"]["in_flight"] == 0
+
+
+def test_interactive_goes_before_batch(make_scheduler):
+    scheduler = make_scheduler(default_budget=1, interactive_reserve=0, tenant_weights={})
+    order = []
+
+    def call(priority):
+        with scheduler.slot("m", priority):
+            order.append(priority)
+
+    scheduler.acquire("m")
+    batch = _start(call, "batch")
+    _wait_until(lambda: _queued(scheduler, "batch") == 1)
+    interactive = _start(call, "interactive")
+    _wait_until(lambda: _queued(scheduler, "interactive") == 1)
+
+    scheduler.release("m")
+    batch.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "batch"]
+
+
+def test_reserved_slot_is_kept_for_interactive(make_scheduler):
+    scheduler = make_scheduler(default_budget=2, interactive_reserve=1, tenant_weights={})
+    admitted = threading.Event()
+
+    def batch_call():
+        with scheduler.slot("m", "batch"):
+            admitted.set()
+
+    scheduler.acquire("m", "batch")
+    thread = _start(batch_call)
+    _wait_until(lambda: _queued(scheduler, "batch") == 1)
+    assert not admitted.wait(0.2)
+
+    token = CancellationToken(timeout=2)
+    scheduler.acquire("m", "interactive", cancel_token=token)
+    assert scheduler.stats()["m"]["in_flight"] == 2
+
+    scheduler.release("m")
+    scheduler.release("m")
+    thread.join(5)
+    assert admitted.is_set()
+
+
+def test_cancelled_waiter_leaves_the_queue(make_scheduler):
+    scheduler = make_scheduler(default_budget=1, tenant_weights={})
+    scheduler.acquire("m")
+
+    token = CancellationToken(timeout=0.2)
+    with pytest.raises(CancelledError):
+        scheduler.acquire("m", "batch", cancel_token=token)
+    assert _queued(scheduler, "batch") == 0
+    assert scheduler.stats()["m"]["in_flight"] == 1
+
+    scheduler.release("m")
+    # A stale waiter left behind would keep this caller from the free slot
+    scheduler.acquire("m", "batch", cancel_token=CancellationToken(timeout=2))
+    scheduler.release("m")
+
+
+def test_tenant_weights_from_env(monkeypatch):
+    monkeypatch.setenv("CORTEX_TENANT_WEIGHTS", "screening=3, research=0.5")
+    assert CortexScheduler(FakeClient()).tenant_weights == {"screening": 3.0, "research": 0.5}
+
+    for text in ("screening=0", "screening", "=2", "screening=abc"):
+        with pytest.raises(ValueError):
+            parse_tenant_weights(text)
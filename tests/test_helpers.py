@@ -0,0 +1,34 @@
+from src.utils.helpers import credibility_score, verdict_label
+
+
+def test_credibility_score_plain():
+    assert credibility_score("Credibility score: 72. The source is reliable.") == 72
+    assert credibility_score("Credibility score: 0") == 0
+
+
+def test_credibility_score_skips_echoed_range():
+    assert credibility_score("Credibility score (0-100): 35") == 35
+    assert credibility_score("**Credibility Score (0 - 100):** 80") == 80
+
+
+def test_credibility_score_missing_or_out_of_range():
+    assert credibility_score("No score given") is None
+    assert credibility_score(None) is None
+    assert credibility_score("Credibility score: 250") is None
+
+
+def test_verdict_label_keywords():
+    assert verdict_label("The claim is credible.") == "credible"
+    assert verdict_label("This is misinformation.") == "misinformation"
+    assert verdict_label("The claim is false.") == "misinformation"
+    assert verdict_label("") is None
+
+
+def test_verdict_label_negation():
+    assert verdict_label("The claim is not credible.") == "misinformation"
+    assert verdict_label("This story is untrue.") == "misinformation"
+    assert verdict_label("It is not entirely true.") == "misinformation"
+
+
+def test_verdict_label_mixed_is_unlabelled():
+    assert verdict_label("Partly true, but the key figure is false.") is None
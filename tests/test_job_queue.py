@@ -0,0 +1,146 @@
+import time
+
+from src.utils.job_queue import JobQueue
+
+
+def _queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_cancelled_job_that_fails_is_not_retried(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("news", "content")
+    queue.claim("w1")
+
+    assert queue.cancel(job_id, "Stopped by user") == "cancelling"
+    assert queue.fail(job_id, "w1", "Error: connection reset")
+
+    job = queue.status(job_id)
+    assert job["status"] == "cancelled"
+    assert job["error"] == "Stopped by user"
+    assert queue.claim("w2") is None
+
+
+def test_stop_reason_keeps_the_cancel_reason(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("news", "content")
+    queue.claim("w1")
+    queue.cancel(job_id, "Stopped by user")
+
+    assert queue.stop_reason(job_id) == "Stopped by user"
+
+
+def test_expired_lease_is_redelivered(tmp_path):
+    queue = _queue(tmp_path, visibility_timeout=0.05)
+    job_id = queue.submit("news", "content")
+    assert queue.claim("w1")["job_id"] == job_id
+    assert queue.claim("w2") is None
+
+    time.sleep(0.1)
+    job = queue.claim("w2")
+    assert job["job_id"] == job_id
+    assert job["attempts"] == 2
+    assert job["lease_owner"] == "w2"
+
+
+def test_extend_lease_keeps_the_job(tmp_path):
+    queue = _queue(tmp_path, visibility_timeout=0.1)
+    job_id = queue.submit("news", "content")
+    queue.claim("w1")
+
+    time.sleep(0.06)
+    assert queue.extend_lease(job_id, "w1")
+    time.sleep(0.06)
+    assert queue.claim("w2") is None
+    assert not queue.extend_lease(job_id, "w2")
+
+
+def test_final_expired_lease_fails_the_job(tmp_path):
+    queue = _queue(tmp_path, visibility_timeout=0.05, max_attempts=2)
+    job_id = queue.submit("news", "content")
+    queue.claim("w1")
+    time.sleep(0.1)
+    queue.claim("w2")
+    time.sleep(0.1)
+
+    assert queue.claim("w3") is None
+    job = queue.status(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "Lease expired after final attempt"
+
+
+def test_fail_retries_until_max_attempts(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2)
+    job_id = queue.submit("news", "content")
+
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "Error: timeout", retry_delay=0)
+    assert queue.status(job_id)["status"] == "queued"
+
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "Error: timeout", retry_delay=0)
+    job = queue.status(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "Error: timeout"
+
+
+def test_permanent_failure_is_not_retried(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("news", "content")
+    queue.claim("w1")
+
+    queue.fail(job_id, "w1", "Error: bad input", retry_delay=0, permanent=True)
+    assert queue.status(job_id)["status"] == "failed"
+    assert queue.claim("w1") is None
+
+
+def test_interactive_jobs_go_first(tmp_path):
+    queue = _queue(tmp_path)
+    batch = queue.submit("news", "batch", priority="batch")
+    interactive = queue.submit("news", "interactive", priority="interactive")
+
+    assert queue.claim("w1")["job_id"] == interactive
+    assert queue.claim("w1")["job_id"] == batch
+
+
+def test_tenant_with_fewest_running_jobs_goes_first(tmp_path):
+    queue = _queue(tmp_path)
+    a1 = queue.submit("news", "a1", priority="batch", tenant="a")
+    a2 = queue.submit("news", "a2", priority="batch", tenant="a")
+    b1 = queue.submit("news", "b1", priority="batch", tenant="b")
+
+    assert [queue.claim("w")["job_id"] for _ in range(3)] == [a1, b1, a2]
+
+
+def test_lease_owner_guards(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("news", "content")
+    queue.claim("w1")
+
+    assert not queue.complete(job_id, "w2", {"consensus_analysis": "x"})
+    assert not queue.fail(job_id, "w2", "Error")
+    assert queue.status(job_id)["status"] == "running"
+
+    assert queue.complete(job_id, "w1", {"consensus_analysis": "x"})
+    assert queue.get(job_id)["result"] == {"consensus_analysis": "x"}
+    assert not queue.complete(job_id, "w1", {"consensus_analysis": "y"})
+
+
+def test_deadline_and_abandoned_jobs_are_never_claimed(tmp_path):
+    queue = _queue(tmp_path, watch_timeout=0.05)
+    late = queue.submit("news", "late", deadline=0.01)
+    watched = queue.submit("news", "watched", watched=True)
+    time.sleep(0.1)
+
+    assert queue.claim("w1") is None
+    assert queue.status(late)["error"] == "Deadline exceeded"
+    assert queue.status(watched)["error"] == "Abandoned: nobody is waiting for the result"
+
+
+def test_cancel_queued_job(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("news", "content")
+
+    assert queue.cancel(job_id) == "cancelled"
+    assert queue.claim("w1") is None
+    assert queue.cancel("missing") is None
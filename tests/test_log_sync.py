@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+from src.utils.logger import AnalysisLogger
+from src.utils.log_sync import LogSyncEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = AnalysisLogger()
+    logger.snowflake_available = True
+    engine = LogSyncEngine(logger, batch_size=2)
+    engine.merged = []
+    monkeypatch.setattr(engine, "_merge_batch", lambda entries: engine.merged.append(entries))
+    return engine
+
+
+def _write(engine, messages, path=None):
+    with open(path or engine.logs_file, "a") as f:
+        for message in messages:
+            f.write(json.dumps({"analysis_id": message, "category": "news", "message": message}) + "\n")
+
+
+def _ids(batches):
+    return [item["analysis_id"] for batch in batches for item in batch]
+
+
+def test_incomplete_last_line_is_left_for_later(engine):
+    _write(engine, ["a", "b"])
+    complete = os.path.getsize(engine.logs_file)
+    with open(engine.logs_file, "a") as f:
+        f.write('{"analysis_id": "c", "categ')
+
+    batches = list(engine.pending_batches(0))
+    assert [offset for offset, _ in batches] == [complete]
+    assert _ids(entries for _, entries in batches) == ["a", "b"]
+
+
+def test_batches_split_on_size(engine):
+    _write(engine, ["a", "b", "c", "d", "e"])
+
+    batches = list(engine.pending_batches(0))
+    assert [[item["analysis_id"] for item in entries] for _, entries in batches] == [["a", "b"], ["c", "d"], ["e"]]
+    assert batches[-1][0] == os.path.getsize(engine.logs_file)
+
+
+def test_legacy_entries_are_flagged(engine):
+    with open(engine.logs_file, "a") as f:
+        f.write(json.dumps({"timestamp": "2024-01-01T00:00:00", "category": "news"}) + "\n")
+
+    (_, entries), = engine.pending_batches(0)
+    assert entries[0]["legacy"] is True
+    assert entries[0]["analysis_id"]
+
+
+def test_sync_resumes_after_a_failed_batch(engine, monkeypatch):
+    _write(engine, ["a", "b", "c", "d", "e"])
+
+    def fail_second(entries):
+        if engine.merged:
+            raise Exception("503 Service Unavailable")
+        engine.merged.append(entries)
+
+    monkeypatch.setattr(engine, "_merge_batch", fail_second)
+    with pytest.raises(Exception):
+        engine.sync(max_retries=0)
+    assert _ids(engine.merged) == ["a", "b"]
+
+    engine.merged = []
+    monkeypatch.setattr(engine, "_merge_batch", lambda entries: engine.merged.append(entries))
+    assert engine.sync(max_retries=0) == 3
+    assert _ids(engine.merged) == ["c", "d", "e"]
+    assert engine.sync(max_retries=0) == 0
+
+
+def test_cleared_log_starts_over_even_past_old_offset(engine, capsys):
+    _write(engine, ["a", "b"])
+    engine.sync()
+    old_offset = engine.load_watermark()
+
+    engine.logger.clear_logs()
+    _write(engine, ["c", "d", "e", "f"])
+    assert os.path.getsize(engine.logs_file) > old_offset
+    assert engine.load_watermark() == 0
+
+    engine.merged = []
+    assert engine.sync() == 4
+    assert _ids(engine.merged) == ["c", "d", "e", "f"]
+    assert f"byte {old_offset}" in capsys.readouterr().out
+
+
+def test_rotated_log_tail_is_synced_first(engine):
+    _write(engine, ["a", "b"])
+    engine.sync()
+    _write(engine, ["c"])
+    os.rename(engine.logs_file, f"{engine.logs_file}.1")
+    _write(engine, ["d", "e", "f"])
+
+    engine.merged = []
+    assert engine.sync() == 4
+    assert _ids(engine.merged) == ["c", "d", "e", "f"]
+    assert engine.sync() == 0
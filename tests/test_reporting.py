@@ -0,0 +1,31 @@
+from src.utils.reporting import ResultsReport
+
+
+def _record(job_id, consensus, responses):
+    return {
+        "job_id": job_id,
+        "category": "news",
+        "result": {"consensus_analysis": consensus, "individual_responses": responses}
+    }
+
+
+def test_scores_skip_echoed_range():
+    report = ResultsReport.from_records([
+        _record("a", "The claim is credible.", {
+            "mistral-large2": "Credibility score (0-100): 85",
+            "llama3.1-70b": "Credibility score: 90",
+        }),
+    ])
+    scores = report.score_matrix().loc["a"]
+    assert scores["mistral-large2"] == 85
+    assert scores["llama3.1-70b"] == 90
+
+
+def test_verdicts_match_verdict_label():
+    report = ResultsReport.from_records([
+        _record("a", "The claim is credible.", {}),
+        _record("b", "The claim is not credible.", {}),
+        _record("c", "Partly true, partly false.", {}),
+    ])
+    verdicts = report.jobs.set_index("job_id")["verdict"]
+    assert verdicts.to_dict() == {"a": "credible", "b": "misinformation", "c": "unclear"}
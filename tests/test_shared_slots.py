@@ -0,0 +1,58 @@
+import time
+
+from src.utils.shared_slots import SharedSlots
+
+
+def _slots(tmp_path, **kwargs):
+    return SharedSlots(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_limit_holds_across_instances(tmp_path):
+    first, second = _slots(tmp_path), _slots(tmp_path)
+
+    lease = first.acquire("account:a", 2)
+    assert lease
+    assert second.acquire("account:a", 2)
+    assert second.acquire("account:a", 2) is None
+    assert first.in_use() == {"account:a": 2}
+
+    first.release(lease)
+    assert second.acquire("account:a", 2)
+
+
+def test_expired_lease_frees_its_slot(tmp_path):
+    slots = _slots(tmp_path, lease_seconds=0.1)
+    # Keep the renewer from extending the lease, as if its process had died
+    slots._renewer = object()
+    slots.acquire("model:m", 1)
+    assert slots.acquire("model:m", 1) is None
+
+    time.sleep(0.15)
+    assert slots.acquire("model:m", 1)
+
+
+def test_rate_limit_empties_the_bucket(tmp_path):
+    slots = _slots(tmp_path)
+    leases = [slots.acquire("account:a", 10, rate_per_minute=3) for _ in range(4)]
+
+    assert all(leases[:3])
+    assert leases[3] is None
+
+
+def test_waiters_are_admitted_by_rank_then_tenant_share(tmp_path):
+    slots = _slots(tmp_path)
+    held = slots.acquire("model:m", 1, tenant="busy")
+    busy = slots.enqueue("model:m", 1, "busy")
+    idle = slots.enqueue("model:m", 1, "idle")
+    urgent = slots.enqueue("model:m", 0, "busy")
+    assert slots.queued() == {"model:m": {0: 1, 1: 2}}
+
+    assert not slots.admit(busy, "model:m", 2)
+    assert slots.admit(urgent, "model:m", 2)
+    slots.release(urgent)
+    # "busy" still holds a slot, so the idle tenant goes first despite queueing later
+    assert not slots.admit(busy, "model:m", 2)
+    assert slots.admit(idle, "model:m", 2)
+    assert not slots.admit(busy, "model:m", 2)
+    slots.release(held)
+    assert slots.admit(busy, "model:m", 2)
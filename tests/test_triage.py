@@ -0,0 +1,56 @@
+import random
+
+from src.models.triage import TriageModel, recommend_threshold, MIN_SKIP_THRESHOLD
+
+GOOD = "official report confirms study data peer reviewed agency".split()
+BAD = "shocking secret they hide miracle cure hoax banned".split()
+
+
+def _examples(n, seed):
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(n):
+        label = int(rng.random() < 0.5)
+        texts.append(" ".join(rng.choices(BAD if label else GOOD, k=8)))
+        labels.append(label)
+    return texts, labels
+
+
+def _report(bands):
+    return {"reliability": [
+        {"confidence_bin": round(0.5 + i * 0.05, 2), "count": count, "error_rate": error}
+        for i, (count, error) in enumerate(bands)
+    ]}
+
+
+def test_threshold_judges_each_band_alone():
+    # Overall error from 0.5 up is ~1%, but the 0.5-0.55 band alone is 20% wrong
+    bands = [(25, 0.2)] + [(25, 0.0)] * 8 + [(2000, 0.0)]
+    assert recommend_threshold(_report(bands), max_error=0.02) == 0.55
+
+
+def test_threshold_stops_at_thin_band_and_floor():
+    bands = [(25, 0.0)] * 7 + [(3, 0.0)] + [(25, 0.0)] * 2
+    assert recommend_threshold(_report(bands), max_error=0.02) == 0.9
+    assert recommend_threshold(_report([(25, 0.0)] * 10), min_threshold=0.9) == 0.9
+    assert recommend_threshold(_report([(25, 0.0)] * 9 + [(25, 0.5)])) is None
+
+
+def test_unknown_words_get_the_full_fan_out():
+    model = TriageModel.train(*_examples(400, seed=0))
+    model.calibrate(*_examples(100, seed=1))
+    model.skip_threshold = model.shorten_threshold = 0.5
+
+    assert model.triage("zzz qqq")["action"] == "full"
+    assert model.triage(" ".join(BAD))["action"] == "skip"
+
+
+def test_skip_threshold_has_a_floor():
+    model = TriageModel.train(*_examples(400, seed=0))
+    # Flatten the calibration so every score sits well under the floor
+    model.calibration = (0.1, 0.0)
+    model.skip_threshold = model.shorten_threshold = 0.5
+
+    result = model.triage(" ".join(BAD))
+    assert 0.5 < result["confidence"] < MIN_SKIP_THRESHOLD
+    assert result["action"] != "skip"
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+import src.models.verification_engine as verification_engine
+from src.api.cortex_scheduler import CortexScheduler
+from src.models.verification_engine import VerificationEngine
+from src.utils.cancellation import CancellationToken, CancelledError
+
+
+class StreamingClient:
+    """Answers the first model at once; later calls stream until cancelled"""
+
+    def __init__(self):
+        self.calls = []
+
+    def complete(self, model, messages, cancel_token=None, **kwargs):
+        self.calls.append(model)
+        if len(self.calls) == 1:
+            return "Credibility: 20. Known hoax."
+        stopped = threading.Event()
+        cancel_token.on_cancel(stopped.set)
+        assert stopped.wait(5), "never cancelled"
+        raise CancelledError(cancel_token.reason, partial="Credibility: 3")
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    client = StreamingClient()
+    monkeypatch.setenv("TRIAGE_MODEL", str(tmp_path / "missing.npz"))
+    monkeypatch.setattr(verification_engine.CortexAccountPool, "from_env", classmethod(lambda cls, slots=None: client))
+    return VerificationEngine(scheduler=CortexScheduler(client, default_budget=2))
+
+
+def test_deadline_returns_partial_responses(engine):
+    token = CancellationToken(timeout=1.0)
+    result = engine.verify("news", "content", cancel_token=token)
+
+    assert result["cancelled"] == "Deadline exceeded"
+    first, second = engine.model_categories["news"]
+    assert result["individual_responses"][first] == "Credibility: 20. Known hoax."
+    assert result["individual_responses"][second] == "Credibility: 3\n\n[Partial response: Deadline exceeded]"
+    assert "no consensus" in result["consensus_analysis"]
+    # The consensus model is never called once the job is stopped
+    assert engine.client.calls == [first, second]
+    assert engine.scheduler.stats()[second]["in_flight"] == 0
+
+
+def test_cancel_between_models_skips_the_rest(engine):
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel, args=("Stopped by user",)).start()
+
+    result = engine.verify("news", "content", cancel_token=token)
+
+    assert result["cancelled"] == "Stopped by user"
+    assert list(result["individual_responses"]) == engine.model_categories["news"][:1]
+    assert engine.client.calls == engine.model_categories["news"][:1]